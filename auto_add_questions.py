@@ -4,6 +4,14 @@ import argparse
 import sys
 from playwright.sync_api import sync_playwright
 
+from wait_strategy import (
+    StepTimer,
+    launch_options,
+    wait_for_dialog,
+    wait_for_fewer,
+    wait_for_loading,
+)
+
 # 创建 ArgumentParser 对象
 parser = argparse.ArgumentParser(description="自动录入题目脚本")
 
@@ -24,12 +32,16 @@ parser.add_argument(
     help="目标网页的 URL",
 )
 
+parser.add_argument(
+    "--fast", action="store_true", help="去掉 slow_mo 慢动作，只靠页面信号等待"
+)
+
 # 解析参数
 # 如果用户没有提供参数，argparse 会自动报错并提示用法
 args = parser.parse_args()
 
 
-def run(file_path, target_url):
+def run(file_path, target_url, fast=False):
     print(f"正在读取文件: {file_path} ...")
     try:
         # data_only=True 读取计算后的值
@@ -44,7 +56,7 @@ def run(file_path, target_url):
     with sync_playwright() as p:
         print("正在启动浏览器...")
         browser = p.chromium.launch(
-            headless=False, slow_mo=500, args=["--start-maximized"]
+            **launch_options(fast, 500, args=["--start-maximized"])
         )
         context = browser.new_context(no_viewport=True)
         page = context.new_page()
@@ -63,6 +75,7 @@ def run(file_path, target_url):
         print("=" * 50 + "\n")
         input(">>> (按回车键开始...)")
         print(">>> 开始执行...")
+        timer = StepTimer()
 
         for i, row in enumerate(rows):
             if i < 1:
@@ -94,7 +107,8 @@ def run(file_path, target_url):
 
                 # 2. 锁定“对话框”
                 dialog = page.get_by_role("dialog", name="添加答题端题目")
-                dialog.wait_for(state="visible", timeout=5000)
+                with timer.step("打开弹窗"):
+                    dialog.wait_for(state="visible", timeout=5000)
 
                 # 3. 填写题目名称
                 name_input = dialog.get_by_placeholder("请输入题目名称")
@@ -118,11 +132,14 @@ def run(file_path, target_url):
                             # 根据你提供的HTML，删除按钮有 class "remove-link"
                             # 也可以用 text="删除答案选项"
                             remove_btn = dialog.locator(".remove-link")
-
-                            # 点击两次
-                            for _ in range(2):
-                                remove_btn.click()
-                                page.wait_for_timeout(300)  # 稍微等待动画
+                            form_items = dialog.locator(".el-form-item")
+
+                            # 点击两次，每次等被删的选项行从弹窗中移除
+                            with timer.step("删除判断题选项"):
+                                for _ in range(2):
+                                    count = form_items.count()
+                                    remove_btn.click()
+                                    wait_for_fewer(form_items, count)
                         except Exception as e:
                             print(f"  -> 删除选项失败(可能按钮点不到): {e}")
 
@@ -161,18 +178,21 @@ def run(file_path, target_url):
                 # 8. 点击“确 定”
                 dialog.get_by_role("button", name="确 定").click()
 
-                # 9. 等待弹窗消失
-                dialog.wait_for(state="hidden", timeout=5000)
-                page.wait_for_timeout(500)
+                # 9. 等待弹窗消失、列表刷新完成
+                with timer.step("保存"):
+                    if not wait_for_dialog(dialog, "hidden", 5000):
+                        raise TimeoutError("保存后弹窗未关闭")
+                    wait_for_loading(page)
 
             except Exception as e:
                 print(f"!!! 第 {i+1} 条出错: {e}")
                 print(">>> 暂停脚本，请检查错误原因 (按 Resume 继续)")
                 page.pause()
 
+        timer.report()
         print("任务完成。")
 
 
 if __name__ == "__main__":
     # 调用主函数
-    run(args.file_path, args.target_url)
+    run(args.file_path, args.target_url, args.fast)
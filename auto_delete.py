@@ -1,15 +1,26 @@
+import argparse
 import time
 from playwright.sync_api import sync_playwright
 
+from wait_strategy import (
+    StepTimer,
+    expect_xhr,
+    launch_options,
+    wait_for_dialog,
+    wait_for_loading,
+)
 
-def run():
+
+def run(fast=False):
     # ================= 配置区域 =================
     TARGET_URL = "https://cwgedu.cn/powerTutoring-ui/#/answer/correction"
+    # 表格数据接口的 URL 片段 (RuoYi 的列表接口都以 /list 结尾，删除接口不带 list)
+    LIST_API = "/list"
     # ===========================================
 
     with sync_playwright() as p:
         print("正在启动浏览器...")
-        browser = p.chromium.launch(headless=False, slow_mo=500)
+        browser = p.chromium.launch(**launch_options(fast, 500))
         context = browser.new_context()
         page = context.new_page()
 
@@ -26,6 +37,7 @@ def run():
 
         # 当前所在的页码，默认从第1页开始
         current_page_num = 1
+        timer = StepTimer()
 
         while True:
             print(f"\n>>> [第 {current_page_num} 页] 正在检查数据...")
@@ -44,22 +56,26 @@ def run():
                 try:
                     target_row.get_by_text("删除").last.click()
 
-                    # 处理二次确认弹窗
-                    try:
-                        confirm_btn = page.get_by_role("button", name="确定")
-                        if confirm_btn.is_visible(timeout=2000):
-                            confirm_btn.click()
-                        else:
-                            page.get_by_role("button", name="确认").click(timeout=1000)
-                    except:
-                        pass
-
-                    # 稍微等待表格刷新
-                    page.wait_for_timeout(1000)
+                    # 处理二次确认弹窗：等弹窗出现后点击，并等待表格刷新完成
+                    with timer.step("确认删除"):
+                        confirm_btn = (
+                            page.get_by_role("button", name="确定")
+                            .or_(page.get_by_role("button", name="确认"))
+                            .first
+                        )
+                        if not wait_for_dialog(confirm_btn, timeout=2000):
+                            print("⚠️ 没有出现确认弹窗，重新检查当前页")
+                            continue
+                        # 确认后先返回删除请求、再返回列表刷新请求，要等的是后者
+                        if (
+                            expect_xhr(page, confirm_btn.click, url_part=LIST_API)
+                            is None
+                        ):
+                            print("⚠️ 等待表格刷新超时，重新检查当前页")
 
                 except Exception as e:
                     print(f"操作重试中: {e}")
-                    page.wait_for_timeout(1000)
+                    wait_for_loading(page)
 
             # --- [外层循环]：数字翻页逻辑 ---
 
@@ -84,12 +100,11 @@ def run():
                 # 有时候数字存在但可能是不可点的文本（比如 "共 2 页"），所以最好检查它是不是 role=listitem 或 button
                 # 这里直接尝试点击，如果报错说明不是按钮
                 try:
-                    next_btn.click()
+                    # 翻页后等新一页的数据请求返回、加载遮罩消失
+                    with timer.step("翻页"):
+                        expect_xhr(page, next_btn.click, url_part=LIST_API)
                     current_page_num += 1
                     print(f">>> 成功点击第 {current_page_num} 页，等待加载...")
-
-                    # 翻页后必须等待，给页面一点加载时间
-                    page.wait_for_timeout(2000)
                 except Exception as e:
                     print(
                         f">>> 找到了数字 {next_page_num} 但无法点击，可能已到末尾或被遮挡。"
@@ -103,8 +118,13 @@ def run():
                 )
                 break
 
+        timer.report()
         print("所有页面处理完毕。")
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="批量删除已删除类目的题目")
+    parser.add_argument(
+        "--fast", action="store_true", help="去掉 slow_mo 慢动作，只靠页面信号等待"
+    )
+    run(parser.parse_args().fast)
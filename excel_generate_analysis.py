@@ -1,19 +1,25 @@
 """
 将指定文件夹下的所有Excel题目生成AI解析
-支持多线程并发处理（默认最多10个文件同时进行）
+基于 asyncio + 连接池化的 HTTP 客户端，所有文件的题目进入同一个行级工作队列并发处理（默认同时25题）
 command: python excel_generate_analysis.py --folder ./data
 """
 
 import openpyxl
-import requests
-import time
+import asyncio
 import os
 import argparse
 import glob
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from itertools import zip_longest
+
+from llm_client import AsyncLLMClient, LLMError
 
 # ================= 配置区域 =================
-parser = argparse.ArgumentParser(description="Excel题目解析生成器(多线程版)")
+parser = argparse.ArgumentParser(description="Excel题目解析生成器(异步并发版)")
 parser.add_argument(
     "--folder",
     type=str,
@@ -24,12 +30,138 @@ parser.add_argument(
     "--workers",
     type=int,
     default=25,
-    help="同时处理的文件数量（默认10）",
+    help="同时处理的题目(行)数量，所有文件共享（默认25）",
+)
+parser.add_argument(
+    "--resume",
+    action="store_true",
+    help="从检查点日志恢复：跳过上次已完成的行，不重复消耗 API 额度",
+)
+parser.add_argument(
+    "--incremental",
+    action="store_true",
+    help="增量模式：跳过未改动的文件，以及指纹(题目+选项+答案)已生成过解析的行",
+)
+parser.add_argument(
+    "--no-consensus",
+    action="store_true",
+    help="关闭一致性检查：每行都调用通义裁判",
+)
+parser.add_argument(
+    "--consensus-threshold",
+    type=float,
+    default=0.35,
+    help="两份解析答案字母一致且字符二元组相似度不低于该值时跳过裁判（默认0.35）",
+)
+parser.add_argument(
+    "--stream",
+    action="store_true",
+    help="流式接收生成结果 (SSE)，统计首 Token 延迟，并按预算截断过长的回答",
+)
+parser.add_argument(
+    "--stream-max-tokens",
+    type=int,
+    default=800,
+    help="流式模式下单个解析的 Token 上限（默认800）",
+)
+parser.add_argument(
+    "--stream-max-seconds",
+    type=float,
+    default=45,
+    help="流式模式下单个解析的耗时上限，单位秒（默认45）",
+)
+parser.add_argument(
+    "--providers",
+    type=str,
+    default=None,
+    help="服务商配置 JSON 文件，覆盖或补充内置的 PROVIDERS 注册表",
+)
+parser.add_argument(
+    "--no-hedge",
+    action="store_true",
+    help="关闭对冲请求：主服务商慢时不向备用服务商补发",
+)
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=100,
+    help="每个模型服务商同时在途的请求数上限",
 )
 config = parser.parse_args()
 
-# 请在此处填入你的 Key
+# 模型服务商注册表：接口地址、模型、Key 所在的环境变量、权重与备用服务商
+# - role: generator 生成解析 / judge 裁判
+# - weight: 生成服务商按权重从高到低取前两个作为候选 A、B；0 表示停用
+# - backup: 主服务商超过其 p90 耗时未返回时，补发请求的备用服务商 (对冲请求)
+# - rpm / tpm: 限流 (按账号额度调整)，tpm 为 None 表示不限
+# 可用 --providers 指定 JSON 文件覆盖或新增条目 (同名字段覆盖，可直接写 api_key)
+PROVIDERS = {
+    "deepseek": {
+        "label": "DeepSeek",
+        "role": "generator",
+        "url": "https://api.deepseek.com/chat/completions",
+        "model": "deepseek-chat",
+        "api_key_env": "DEEPSEEK_API_KEY",
+        "temperature": 1.0,
+        "weight": 1.0,
+        "backup": "doubao",
+        "rpm": 600,
+        "tpm": None,
+    },
+    "kimi": {
+        "label": "Kimi",
+        "role": "generator",
+        "url": "https://api.moonshot.cn/v1/chat/completions",
+        "model": "moonshot-v1-8k",
+        "api_key_env": "KIMI_API_KEY",
+        "temperature": 0.3,
+        "weight": 0.9,
+        # 备用不能是另一个候选 (DeepSeek)，否则候选 B 会变成第二份 DeepSeek 解析
+        "backup": "doubao",
+        "rpm": 200,
+        "tpm": 1000000,
+    },
+    "doubao": {
+        "label": "豆包",
+        "role": "generator",
+        # 火山引擎 (Ark) 的标准兼容接口地址
+        "url": "https://ark.cn-beijing.volces.com/api/v3/chat/completions",
+        # 注意：豆包的 model 需要填【推理接入点 ID】，而不是模型名称
+        "model_env": "DOUBAO_ENDPOINT_ID",
+        "api_key_env": "DOUBAO_API_KEY",
+        "temperature": 0.7,  # 豆包建议稍微降低一点温度以保证稳定性
+        "weight": 0.5,
+        "backup": "kimi",
+        "rpm": 600,
+        "tpm": None,
+    },
+    "tongyi": {
+        "label": "通义",
+        "role": "judge",
+        "url": "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
+        "model": "qwen-plus",
+        "api_key_env": "DASHSCOPE_API_KEY",
+        "temperature": 0.1,
+        "weight": 1.0,
+        "backup": None,
+        "rpm": 600,
+        "tpm": None,
+    },
+}
+
+GENERATION_SYSTEM_PROMPT = (
+    "你是一位计算机辅导老师。请针对题目给出解析。回答简洁明了，别说废话。"
+)
+
 
+# 增量模式使用的持久化文件 (保存在目标文件夹内)
+ANALYSIS_STORE_FILE = "解析生成_指纹库.sqlite"
+FILE_MANIFEST_FILE = "解析生成_文件清单.json"
+
+# 从解析文本中提取答案字母，如 "答案：B"、"故选AC"、"正确答案为 D"
+ANSWER_LETTER_PATTERN = re.compile(
+    r"(?:正确答案|参考答案|答案|故选|应选|选)\s*(?:是|为|应为)?\s*[:：]?\s*([A-D](?:[、,，\s]*[A-D])*)"
+)
 
 # 列名关键词映射
 HEADER_KEYWORDS = {
@@ -48,151 +180,172 @@ HEADER_KEYWORDS = {
 
 
 # ===========================================
-def call_doubao_api(prompt):
-    """调用豆包 (火山引擎) 获取解析"""
-    if not DOUBAO_API_KEY:
-        print("错误: 未配置 DOUBAO_API_KEY")
-        return None
+def load_providers(config_path=None):
+    """
+    合并内置注册表与 JSON 配置文件，并从环境变量读取 Key / 模型。
+    返回 {name: provider}，每个 provider 带有解析后的 api_key 与 model。
+    """
+    providers = {name: dict(spec) for name, spec in PROVIDERS.items()}
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        for name, spec in overrides.items():
+            providers.setdefault(name, {"label": name, "backup": None})
+            providers[name].update(spec)
+
+    for name, spec in providers.items():
+        if not spec.get("api_key") and spec.get("api_key_env"):
+            spec["api_key"] = os.environ.get(spec["api_key_env"], "")
+        if not spec.get("model") and spec.get("model_env"):
+            spec["model"] = os.environ.get(spec["model_env"], "")
+        spec["name"] = name
+    return providers
+
+
+def available(spec):
+    """已配置 Key 与模型、且权重大于 0 的服务商才参与调用"""
+    return bool(
+        spec and spec.get("api_key") and spec.get("model") and spec.get("weight", 1)
+    )
+
+
+def pick_generators(providers):
+    """按权重取前两个可用的生成服务商，作为候选 A、B"""
+    candidates = [
+        spec
+        for spec in providers.values()
+        if spec.get("role") == "generator" and available(spec)
+    ]
+    candidates.sort(key=lambda spec: spec.get("weight", 1), reverse=True)
+    return candidates[:2]
 
-    # 火山引擎 (Ark) 的标准兼容接口地址
-    url = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DOUBAO_API_KEY}",
-    }
+def pick_judge(providers):
+    judges = [
+        spec
+        for spec in providers.values()
+        if spec.get("role") == "judge" and available(spec)
+    ]
+    return max(judges, key=lambda spec: spec.get("weight", 1)) if judges else None
 
-    data = {
-        # 注意：这里需要填入【推理接入点 ID】，而不是模型名称
-        "model": DOUBAO_ENDPOINT_ID,
-        "messages": [
-            {
-                "role": "system",
-                "content": "你是一位计算机辅导老师。请针对题目给出解析。回答简洁明了，别说废话。",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0.7,  # 豆包建议稍微降低一点温度以保证稳定性
+
+def chat_call(client, spec, messages, options):
+    """返回一个向 spec 服务商发送请求的无参协程函数，供对冲请求使用"""
+    payload = {
+        "model": spec["model"],
+        "messages": messages,
+        "temperature": spec.get("temperature", 0.7),
         "stream": False,
     }
 
-    for attempt in range(3):
-        try:
-            # 增加超时时间，豆包有时候处理较慢
-            res = requests.post(url, headers=headers, json=data, timeout=60)
-
-            if res.status_code == 200:
-                # 豆包的返回结构与 OpenAI/DeepSeek 兼容
-                return res.json()["choices"][0]["message"]["content"]
-            else:
-                # 打印错误详情方便调试
-                print(f"⚠️ 豆包报错: {res.status_code} - {res.text}")
-                time.sleep(1)
-        except Exception as e:
-            print(f"网络请求异常: {e}")
-            time.sleep(1)
+    def call():
+        return client.chat(
+            spec["name"], spec["url"], spec["api_key"], payload, timeout=60, **options
+        )
 
-    return None
+    return call
 
 
-def call_deepseek_api(prompt):
-    """调用 DeepSeek 获取解析"""
-    if not Deep_seek_API_KEY:
-        return None
-    url = "https://api.deepseek.com/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {Deep_seek_API_KEY}",
+def generation_options():
+    """生成解析时的 chat 参数：开启 --stream 时走流式接收并带上预算"""
+    if not config.stream:
+        return {}
+    return {
+        "stream": True,
+        "max_tokens": config.stream_max_tokens,
+        "max_seconds": config.stream_max_seconds,
     }
-    data = {
-        "model": "deepseek-chat",
-        "messages": [
-            {
-                "role": "system",
-                "content": "你是一位计算机辅导老师。请针对题目给出解析。回答简洁明了，别说废话。",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 1.0,
-        "stream": False,
-    }
-
-    for attempt in range(3):
-        try:
-            res = requests.post(url, headers=headers, json=data, timeout=60)
-            if res.status_code == 200:
-                return res.json()["choices"][0]["message"]["content"]
-            else:
-                # print(f"⚠️ DeepSeek 报错: {res.status_code}")
-                time.sleep(1)
-        except Exception:
-            time.sleep(1)
-    return None
 
 
-def call_kimi_api(prompt):
-    """调用 Kimi 获取解析"""
-    if not Kimi_API_KEY:
-        return None
-    url = "https://api.moonshot.cn/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {Kimi_API_KEY}",
-    }
-    data = {
-        "model": "moonshot-v1-8k",
-        "messages": [
-            {
-                "role": "system",
-                "content": "你是一位计算机辅导老师。请针对题目给出解析。回答简洁明了，别说废话。",
-            },
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": 0.3,
-        "stream": False,
-    }
-
-    for attempt in range(3):
-        try:
-            res = requests.post(url, headers=headers, json=data, timeout=60)
-            if res.status_code == 200:
-                return res.json()["choices"][0]["message"]["content"]
-            else:
-                if res.status_code == 429:
-                    time.sleep(5)  # Rate limit backoff
-        except Exception:
-            time.sleep(1)
+def pick_backup(providers, spec, exclude=()):
+    """
+    沿 backup 链找第一个可用、且不是自己也不在 exclude 中的备用服务商。
+    exclude 为本行已选中的生成服务商：备用不能和另一个候选撞车。
+    """
+    skip = {spec["name"], *exclude}
+    visited = set()
+    backup = providers.get(spec.get("backup"))
+    while backup is not None and backup["name"] not in visited:
+        visited.add(backup["name"])
+        if backup["name"] not in skip and available(backup):
+            return backup
+        backup = providers.get(backup.get("backup"))
     return None
 
 
-def call_tongyi_judge(question_context, deepseek_ans, kimi_ans, original_ans=None):
-    """核心裁判逻辑"""
-    if not Tongyi_API_KEY:
-        return deepseek_ans if deepseek_ans else kimi_ans
+async def call_provider(
+    client, providers, spec, messages, options=None, hedge=True, exclude=()
+):
+    """
+    调用一个服务商；配置了可用的备用服务商时使用对冲请求。
+    返回 (结果, 实际给出结果的服务商配置)，全部失败时返回 (None, None)。
+    """
+    options = options or {}
+    backup = pick_backup(providers, spec, exclude) if hedge else None
+    backup_call = chat_call(client, backup, messages, options) if backup else None
+    try:
+        content, source = await client.hedged(
+            spec["name"],
+            chat_call(client, spec, messages, options),
+            backup_call,
+            backup["name"] if backup else None,
+        )
+    except LLMError as e:
+        print(f"⚠️ {spec['label']} 报错: {e}")
+        return None, None
+    return content, providers.get(source, spec)
 
-    url = "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {Tongyi_API_KEY}",
-    }
 
-    judge_content = f"【题目信息】\n{question_context}\n\n"
+async def generate_analysis(client, providers, spec, prompt, exclude=()):
+    """
+    调用生成服务商获取解析，返回 (解析, 实际给出解析的服务商配置)。
+    exclude 为同一行的其它候选服务商，对冲时不会把它们当作备用。
+    """
+    messages = [
+        {"role": "system", "content": GENERATION_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    return await call_provider(
+        client,
+        providers,
+        spec,
+        messages,
+        generation_options(),
+        hedge=not config.no_hedge,
+        exclude=exclude,
+    )
+
+
+async def call_judge(
+    client, providers, judge, question_context, candidates, original_ans=None
+):
+    """
+    核心裁判逻辑
+    candidates: [(实际给出解析的服务商, 解析)]，依次标记为 A、B
+    返回 (最佳解析, 选中的标签 A/B/C)，没有任何候选时返回 (None, None)
+    """
     options_map = {}
-
-    if deepseek_ans:
-        judge_content += f"【待选解析 A (DeepSeek)】\n{deepseek_ans}\n\n"
-        options_map["A"] = deepseek_ans
-    if kimi_ans:
-        judge_content += f"【待选解析 B (Kimi)】\n{kimi_ans}\n\n"
-        options_map["B"] = kimi_ans
+    judge_content = f"【题目信息】\n{question_context}\n\n"
+    for tag, (spec, answer) in zip("AB", candidates):
+        if answer:
+            judge_content += f"【待选解析 {tag} ({spec['label']})】\n{answer}\n\n"
+            options_map[tag] = answer
     if original_ans and len(str(original_ans)) > 5:
         judge_content += f"【待选解析 C (原始记录)】\n{original_ans}\n\n"
         options_map["C"] = original_ans
 
+    def fallback():
+        for tag in ("A", "B"):
+            if tag in options_map:
+                return options_map[tag], tag
+        return None, None
+
     if not options_map:
-        return None
+        return None, None
     if len(options_map) == 1:
-        return list(options_map.values())[0]
+        return next((value, key) for key, value in options_map.items())
+    if judge is None:
+        return fallback()
 
     judge_content += """
     请作为该领域的资深专家，评估上述不同来源的解析。
@@ -200,40 +353,49 @@ def call_tongyi_judge(question_context, deepseek_ans, kimi_ans, original_ans=Non
     请决策：哪个解析质量最高？
     **请只返回最佳解析对应的字母标签（A、B 或 C），不要包含任何标点符号或其他废话。**
     """
+    messages = [
+        {"role": "system", "content": "你是一个只输出标签（A/B/C）的评判机器。"},
+        {"role": "user", "content": judge_content},
+    ]
 
-    data = {
-        "model": "qwen-plus",
-        "messages": [
-            {"role": "system", "content": "你是一个只输出标签（A/B/C）的评判机器。"},
-            {"role": "user", "content": judge_content},
-        ],
-        "temperature": 0.1,
-    }
+    content, _ = await call_provider(client, providers, judge, messages)
+    if content is None:
+        return fallback()
+
+    result_tag = content.strip().upper()
+    for tag in ("A", "B", "C"):
+        if tag in result_tag and tag in options_map:
+            return options_map[tag], tag
+    return fallback()
+
+
+def extract_answer_letters(text):
+    """提取解析中给出的答案字母 (排序去重后拼接)，找不到时返回 None"""
+    match = ANSWER_LETTER_PATTERN.search(text or "")
+    if not match:
+        return None
+    return "".join(sorted(set(re.findall(r"[A-D]", match.group(1)))))
 
-    for attempt in range(3):
-        try:
-            res = requests.post(url, headers=headers, json=data, timeout=60)
-            if res.status_code == 200:
-                result_tag = (
-                    res.json()["choices"][0]["message"]["content"].strip().upper()
-                )
-                target_key = None
-                if "A" in result_tag and "A" in options_map:
-                    target_key = "A"
-                elif "B" in result_tag and "B" in options_map:
-                    target_key = "B"
-                elif "C" in result_tag and "C" in options_map:
-                    target_key = "C"
-
-                return (
-                    options_map[target_key]
-                    if target_key
-                    else (deepseek_ans or kimi_ans)
-                )
-        except Exception:
-            time.sleep(1)
 
-    return deepseek_ans if deepseek_ans else kimi_ans
+def ngram_similarity(text_a, text_b, n=2):
+    """字符 n-gram 的 Jaccard 相似度 (忽略空白)"""
+    a = re.sub(r"\s+", "", text_a or "")
+    b = re.sub(r"\s+", "", text_b or "")
+    grams_a = {a[i : i + n] for i in range(max(1, len(a) - n + 1))}
+    grams_b = {b[i : i + n] for i in range(max(1, len(b) - n + 1))}
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def candidates_agree(deepseek_ans, kimi_ans, threshold):
+    """两份解析给出相同的答案字母且内容足够相似时视为一致，无需裁判"""
+    if not deepseek_ans or not kimi_ans:
+        return False
+    letters = extract_answer_letters(deepseek_ans)
+    if not letters or letters != extract_answer_letters(kimi_ans):
+        return False
+    return ngram_similarity(deepseek_ans, kimi_ans) >= threshold
 
 
 def find_column_indices(sheet):
@@ -250,24 +412,221 @@ def find_column_indices(sheet):
     return mapping
 
 
-def process_single_excel(file_path):
+def text_hash(text):
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+class RowJournal:
     """
-    处理单个 Excel 文件的核心逻辑
+    单个文件的逐行检查点日志 (JSONL，与 res_ 文件放在同一目录)。
+    每完成一行追加 {"row", "q": 题目哈希, "analysis", "choice": 裁判选择} 并立即 flush，
+    崩溃、Ctrl-C 或服务商故障后可用 --resume 跳过已完成的行。
     """
+
+    def __init__(self, path):
+        self.path = path
+        self._fp = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def replay(self):
+        """返回 {行号: 记录}；末尾写了一半的行会被忽略"""
+        entries = {}
+        if not self.exists():
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                    entries[int(item["row"])] = item
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return entries
+
+    def record(self, row_idx, q_hash, analysis, choice):
+        if self._fp is None:
+            self._fp = open(self.path, "a", encoding="utf-8")
+        item = {"row": row_idx, "q": q_hash, "analysis": analysis, "choice": choice}
+        self._fp.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self._fp.flush()
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def discard(self):
+        """结果文件保存成功后删除日志"""
+        self.close()
+        if self.exists():
+            os.remove(self.path)
+
+
+# 参与行指纹计算的列：题目 + 选项 + 答案
+FINGERPRINT_KEYS = [
+    "question",
+    "option_a",
+    "option_content1",
+    "option_b",
+    "option_content2",
+    "option_c",
+    "option_content3",
+    "option_d",
+    "option_content4",
+    "answer",
+]
+
+
+class AnalysisStore:
+    """
+    增量模式的持久化解析库 (SQLite)：行指纹 -> 已生成的解析。
+    指纹相同的行 (题目、选项、答案均未改动) 直接复用，不再调用任何模型。
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS analyses (
+                   fp TEXT PRIMARY KEY,
+                   analysis TEXT NOT NULL,
+                   choice TEXT,
+                   updated REAL NOT NULL
+               )""")
+        self._pending = 0
+
+    def get(self, fp):
+        row = self.conn.execute(
+            "SELECT analysis FROM analyses WHERE fp = ?", (fp,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, fp, analysis, choice):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO analyses (fp, analysis, choice, updated) VALUES (?, ?, ?, ?)",
+            (fp, analysis, choice, time.time()),
+        )
+        self._pending += 1
+        if self._pending >= 20:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def file_signature(file_path, with_hash=True):
+    """文件签名：mtime + size (+ sha256)，用于判断文件是否被改动"""
+    stat = os.stat(file_path)
+    signature = {"mtime": stat.st_mtime, "size": stat.st_size}
+    if with_hash:
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        signature["sha256"] = h.hexdigest()
+    return signature
+
+
+def file_unchanged(file_path, recorded):
+    """与清单中的记录比较：size 不同必然改动；mtime 相同视为未改动；否则比较哈希"""
+    if not recorded:
+        return False
+    quick = file_signature(file_path, with_hash=False)
+    if quick["size"] != recorded.get("size"):
+        return False
+    if quick["mtime"] == recorded.get("mtime"):
+        return True
+    return file_signature(file_path)["sha256"] == recorded.get("sha256")
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ExcelJob:
+    """一个待处理的 Excel 文件：工作簿、列映射，以及尚未完成的行数"""
+
+    def __init__(self, file_path, wb, sheet, col_map):
+        self.file_path = file_path
+        self.filename = os.path.basename(file_path)
+        self.wb = wb
+        self.sheet = sheet
+        self.col_map = col_map
+        self.total_rows = 0
+        self.remaining = 0
+        self.done_rows = 0
+        self.processed_count = 0
+        self.resumed_count = 0
+        self.result_path = os.path.join(
+            os.path.dirname(file_path), f"res_{self.filename}"
+        )
+        self.journal = RowJournal(self.result_path + ".journal.jsonl")
+        self.store = None
+        self.signature = None
+        self.reused_count = 0
+
+    def get_val(self, r_idx, key):
+        """安全获取单元格值"""
+        if key in self.col_map:
+            val = self.sheet.cell(row=r_idx, column=self.col_map[key]).value
+            return str(val).strip() if val else ""
+        return ""
+
+    def fingerprint(self, r_idx):
+        """行指纹：题目 + 选项 + 答案"""
+        parts = [self.get_val(r_idx, key) for key in FINGERPRINT_KEYS]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def build_prompt(job, row_idx):
+    """根据行内容拼出生成解析用的 Prompt"""
+    get_val = job.get_val
+    prompt_text = f"""
+        题目：{get_val(row_idx, "question")}
+        选项：
+        A. {get_val(row_idx, 'option_a')} {get_val(row_idx, 'option_content1')}
+        B. {get_val(row_idx, 'option_b')} {get_val(row_idx, 'option_content2')}
+        C. {get_val(row_idx, 'option_c')} {get_val(row_idx, 'option_content3')}
+        D. {get_val(row_idx, 'option_d')} {get_val(row_idx, 'option_content4')}
+        参考答案：{get_val(row_idx, "answer")}
+        
+        要求：
+        1. 请给出知识点解析,尽量简洁，别说废话。
+        """
+    return prompt_text.strip()
+
+
+async def load_excel_job(file_path, store=None):
+    """读取 Excel 并映射列，返回 (ExcelJob, 待处理行号列表)，无法处理时返回 None"""
     filename = os.path.basename(file_path)
-    print(f"🔄 [开始处理] {filename}")
+    print(f"🔄 [开始读取] {filename}")
 
     try:
-        wb = openpyxl.load_workbook(file_path)
+        # openpyxl 解析是阻塞操作，放到线程里避免卡住事件循环
+        wb = await asyncio.to_thread(openpyxl.load_workbook, file_path)
         sheet = wb.active
     except Exception as e:
         print(f"❌ [读取失败] {filename}: {e}")
-        return
+        return None
 
     col_map = find_column_indices(sheet)
     if "question" not in col_map:
         print(f"⚠️ [跳过] {filename} - 未找到‘题目’列")
-        return
+        return None
 
     # 确保解析列存在
     if "analysis" not in col_map:
@@ -275,68 +634,231 @@ def process_single_excel(file_path):
         sheet.cell(row=1, column=new_col).value = "解析"
         col_map["analysis"] = new_col
 
-    rows = list(sheet.iter_rows(min_row=2))
-    total_rows = len(rows)
-    processed_count = 0
-
-    # 辅助函数：安全获取单元格值
-    def get_val(r_idx, key):
-        if key in col_map:
-            val = sheet.cell(row=r_idx, column=col_map[key]).value
-            return str(val).strip() if val else ""
-        return ""
+    job = ExcelJob(file_path, wb, sheet, col_map)
+    job.store = store
+    if store is not None:
+        job.signature = await asyncio.to_thread(file_signature, file_path)
+
+    checkpoint = {}
+    if job.journal.exists():
+        if config.resume:
+            checkpoint = job.journal.replay()
+        else:
+            # 检查点里是已经付过费的生成结果，不能因为漏了参数就删掉：保留并跳过该文件
+            print(
+                f"⚠️ [跳过] {filename} - 发现上次的检查点 "
+                f"{os.path.basename(job.journal.path)}，请加 --resume 继续；"
+                f"确实要从头处理时请手动删除该检查点"
+            )
+            return None
+
+    row_indices = []
+    for row_idx in range(2, sheet.max_row + 1):
+        q_text = job.get_val(row_idx, "question")
+        if not q_text or q_text.lower() == "nan":
+            continue
+        entry = checkpoint.get(row_idx)
+        # 题目哈希一致才复用，防止文件在两次运行之间被编辑导致错位
+        if entry and entry.get("q") == text_hash(q_text):
+            if entry.get("analysis"):
+                sheet.cell(row=row_idx, column=col_map["analysis"]).value = entry[
+                    "analysis"
+                ]
+                job.processed_count += 1
+            job.resumed_count += 1
+            if store is not None and entry.get("analysis"):
+                store.put(
+                    job.fingerprint(row_idx), entry["analysis"], entry.get("choice")
+                )
+            continue
+        # 增量模式：指纹命中解析库的行直接复用
+        if store is not None:
+            stored = store.get(job.fingerprint(row_idx))
+            if stored:
+                sheet.cell(row=row_idx, column=col_map["analysis"]).value = stored
+                job.processed_count += 1
+                job.reused_count += 1
+                continue
+        row_indices.append(row_idx)
+
+    if job.resumed_count:
+        print(
+            f"♻️ [{filename}] 从检查点恢复 {job.resumed_count} 行，剩余 {len(row_indices)} 行"
+        )
+    if job.reused_count:
+        print(f"♻️ [{filename}] 指纹未变，复用已有解析 {job.reused_count} 行")
 
-    # 遍历行 (去掉了 tqdm，改用简单的进度打印，因为多线程下 tqdm 会乱)
-    for i, row in enumerate(rows):
-        row_idx = row[0].row
+    job.total_rows = len(row_indices)
+    job.remaining = len(row_indices)
+    return job, row_indices
 
-        # 每处理10条打印一次日志，避免刷屏
-        if i % 10 == 0 and i > 0:
-            print(f"   ⏳ [{filename}] 进度: {i}/{total_rows}")
 
-        q_text = get_val(row_idx, "question")
-        if not q_text or q_text.lower() == "nan":
-            continue
+async def save_excel_job(job, manifest=None):
+    """文件的所有行都完成后保存为 res_ 文件，保存成功后删除检查点日志"""
+    final_name = job.result_path
+    try:
+        await asyncio.to_thread(job.wb.save, final_name)
+        job.journal.discard()
+        if manifest is not None and job.signature is not None:
+            manifest[job.filename] = job.signature
+        print(
+            f"✅ [完成] {job.filename} -> 已保存至: {final_name} (处理了 {job.processed_count} 题)"
+        )
+    except Exception as e:
+        print(f"❌ [保存失败] {job.filename}: {e}")
 
-        original_analysis = sheet.cell(row=row_idx, column=col_map["analysis"]).value
 
-        correct_answer = get_val(row_idx, "answer")
-        prompt_text = f"""
-        题目：{q_text}
-        选项：
-        A. {get_val(row_idx, 'option_a')} {get_val(row_idx, 'option_content1')}
-        B. {get_val(row_idx, 'option_b')} {get_val(row_idx, 'option_content2')}
-        C. {get_val(row_idx, 'option_c')} {get_val(row_idx, 'option_content3')}
-        D. {get_val(row_idx, 'option_d')} {get_val(row_idx, 'option_content4')}
-        参考答案：{correct_answer}
-        
-        要求：
-        1. 请给出知识点解析,尽量简洁，别说废话。
-        """
-        prompt_text = prompt_text.strip()
-
-        # 串行调用 API（每个线程内部串行）
-        ds_res = call_deepseek_api(prompt_text)
-        ki_res = call_kimi_api(prompt_text)
-        # doubao_res = call_doubao_api(prompt_text)
-        best_analysis = call_tongyi_judge(
-            prompt_text, ds_res, ki_res, original_analysis
+async def process_row(client, job, row_idx, router, judge_stats):
+    """
+    处理单行：两个生成服务商 (默认 DeepSeek 与 Kimi) 并发生成，再交给裁判。
+    两份解析一致且没有原始解析参与比较时跳过裁判，直接采用候选 A。
+    """
+    sheet = job.sheet
+    original_analysis = sheet.cell(row=row_idx, column=job.col_map["analysis"]).value
+    prompt_text = build_prompt(job, row_idx)
+
+    generators = router["generators"]
+    names = [spec["name"] for spec in generators]
+    results = await asyncio.gather(
+        *(
+            generate_analysis(client, router["providers"], spec, prompt_text, names)
+            for spec in generators
         )
+    )
+    # 对冲后候选可能由备用服务商给出，裁判看到的来源与一致性判断都以实际来源为准
+    candidates = [
+        (source or spec, answer) for spec, (answer, source) in zip(generators, results)
+    ]
+    answers = [answer for _, answer in candidates]
+    ans_a = answers[0] if len(answers) > 0 else None
+    ans_b = answers[1] if len(answers) > 1 else None
+    distinct_sources = len(candidates) > 1 and (
+        candidates[0][0]["name"] != candidates[1][0]["name"]
+    )
+
+    has_original = original_analysis and len(str(original_analysis)) > 5
+    if (
+        not config.no_consensus
+        and not has_original
+        and distinct_sources
+        and candidates_agree(ans_a, ans_b, config.consensus_threshold)
+    ):
+        best_analysis, choice = ans_a, "A"
+        judge_stats["skipped"] += 1
+    else:
+        best_analysis, choice = await call_judge(
+            client,
+            router["providers"],
+            router["judge"],
+            prompt_text,
+            candidates,
+            original_analysis,
+        )
+        if ans_a and ans_b:
+            judge_stats["judged"] += 1
+
+    # 写回对应工作簿 (所有协程都在同一个事件循环线程里，无需加锁)
+    if best_analysis:
+        sheet.cell(row=row_idx, column=job.col_map["analysis"]).value = best_analysis
+        job.processed_count += 1
+
+    # 只要拿到了新生成的解析就记入检查点；两个模型都失败的行留待下次重试
+    if any(answers):
+        job.journal.record(
+            row_idx, text_hash(job.get_val(row_idx, "question")), best_analysis, choice
+        )
+        if job.store is not None and best_analysis:
+            job.store.put(job.fingerprint(row_idx), best_analysis, choice)
 
-        if best_analysis:
-            sheet.cell(row=row_idx, column=col_map["analysis"]).value = best_analysis
-            processed_count += 1
 
-    # 保存文件
-    dir_name = os.path.dirname(file_path)
-    final_name = os.path.join(dir_name, f"res_{filename}")
-    try:
-        wb.save(final_name)
+def interleave_tasks(job_rows):
+    """按文件轮转排列 (file, row) 任务，避免小文件排在大文件后面迟迟不能落盘"""
+    iterators = [[(job, r) for r in rows] for job, rows in job_rows]
+    tasks = []
+    for group in zip_longest(*iterators):
+        tasks.extend(t for t in group if t is not None)
+    return tasks
+
+
+async def process_all_files(
+    files_to_process, max_workers, router, store=None, manifest=None
+):
+    """
+    全局 (文件, 行) 工作队列：所有文件的行共享 max_workers 个并发名额，
+    总耗时取决于 总行数 / 并发数，而不是最大的那个文件。
+    """
+    load_semaphore = asyncio.Semaphore(4)
+
+    async def load_one(f_path):
+        async with load_semaphore:
+            return await load_excel_job(f_path, store)
+
+    loaded = await asyncio.gather(*(load_one(f) for f in files_to_process))
+    job_rows = [item for item in loaded if item is not None]
+
+    save_tasks = []
+    for job, rows in job_rows:
+        if not rows:
+            save_tasks.append(asyncio.create_task(save_excel_job(job, manifest)))
+
+    queue = asyncio.Queue()
+    for task in interleave_tasks(job_rows):
+        queue.put_nowait(task)
+    total = queue.qsize()
+    print(f"📋 共 {len(job_rows)} 个文件、{total} 道题目进入工作队列\n")
+    judge_stats = {"judged": 0, "skipped": 0}
+
+    rate_limits = {
+        name: (spec.get("rpm", 600), spec.get("tpm"))
+        for name, spec in router["providers"].items()
+    }
+    async with AsyncLLMClient(
+        default_concurrency=config.concurrency, rate_limits=rate_limits
+    ) as client:
+
+        async def worker():
+            while True:
+                try:
+                    job, row_idx = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await process_row(client, job, row_idx, router, judge_stats)
+                except Exception as exc:
+                    print(f"❌ [{job.filename}] 第 {row_idx} 行处理异常: {exc}")
+                finally:
+                    job.remaining -= 1
+                    job.done_rows += 1
+                    # 每处理10条打印一次日志，避免刷屏
+                    if job.done_rows % 10 == 0 and job.remaining > 0:
+                        print(
+                            f"   ⏳ [{job.filename}] 进度: {job.done_rows}/{job.total_rows}"
+                            f"  ({client.rate_status()})"
+                        )
+                    if job.remaining == 0:
+                        save_tasks.append(
+                            asyncio.create_task(save_excel_job(job, manifest))
+                        )
+
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(max(1, min(max_workers, total)))
+        ]
+        await asyncio.gather(*workers)
+
+        summary = client.stats_summary()
+        if summary:
+            print(f"\n📊 模型调用统计：\n{summary}")
+
+    await asyncio.gather(*save_tasks)
+
+    contested = judge_stats["judged"] + judge_stats["skipped"]
+    if contested:
         print(
-            f"✅ [完成] {filename} -> 已保存至: {final_name} (处理了 {processed_count} 题)"
+            f"\n⚖️ 裁判统计：{contested} 行有两份候选解析，"
+            f"一致跳过裁判 {judge_stats['skipped']} 行 "
+            f"({judge_stats['skipped'] / contested:.1%})"
         )
-    except Exception as e:
-        print(f"❌ [保存失败] {filename}: {e}")
 
 
 def main():
@@ -357,25 +879,53 @@ def main():
         and not os.path.basename(f).startswith("~$")
     ]
 
+    providers = load_providers(config.providers)
+    router = {
+        "providers": providers,
+        "generators": pick_generators(providers),
+        "judge": pick_judge(providers),
+    }
+    if not router["generators"]:
+        print("❌ 没有可用的生成服务商，请设置 API Key 环境变量 (如 DEEPSEEK_API_KEY)")
+        return
+    judge = router["judge"]
+    print(
+        f"🤖 生成: {' / '.join(spec['label'] for spec in router['generators'])}"
+        f"，裁判: {judge['label'] if judge else '无 (取候选 A)'}"
+    )
+
     print(f"📂 扫描目录: {target_folder}")
     print(f"🔢 发现 Excel 文件: {len(files_to_process)} 个")
-    print(f"🚀 启动多线程处理 (最大并发: {max_workers})...\n")
-
-    # 使用线程池并发处理
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 提交所有任务
-        futures = {
-            executor.submit(process_single_excel, f_path): f_path
-            for f_path in files_to_process
-        }
-
-        # 等待完成（此处可选）
-        for future in as_completed(futures):
-            f_path = futures[future]
-            try:
-                future.result()
-            except Exception as exc:
-                print(f"❌ 文件 {f_path} 处理过程抛出未捕获异常: {exc}")
+
+    store = None
+    manifest = None
+    manifest_path = os.path.join(target_folder, FILE_MANIFEST_FILE)
+    if config.incremental:
+        manifest = load_manifest(manifest_path)
+        changed_files = []
+        for f in files_to_process:
+            name = os.path.basename(f)
+            result_exists = os.path.exists(os.path.join(target_folder, f"res_{name}"))
+            if result_exists and file_unchanged(f, manifest.get(name)):
+                continue
+            changed_files.append(f)
+        print(
+            f"⏭️ 增量模式：{len(files_to_process) - len(changed_files)} 个文件未改动已跳过，"
+            f"{len(changed_files)} 个文件需要处理"
+        )
+        files_to_process = changed_files
+        store = AnalysisStore(os.path.join(target_folder, ANALYSIS_STORE_FILE))
+
+    print(f"🚀 启动行级异步并发处理 (同时处理的题目数: {max_workers})...\n")
+
+    try:
+        asyncio.run(
+            process_all_files(files_to_process, max_workers, router, store, manifest)
+        )
+    finally:
+        if store is not None:
+            store.close()
+            save_manifest(manifest_path, manifest)
 
     print("\n🎉 所有文件处理任务结束！")
 
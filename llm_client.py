@@ -0,0 +1,350 @@
+"""
+异步 LLM 调用引擎 (questions_classification.py / excel_generate_analysis.py 共用)
+
+- 全局共享一个连接池化的 httpx.AsyncClient：keep-alive 复用 TLS 连接，安装了 h2 时自动启用 HTTP/2
+- 每个服务商 (provider) 一个信号量，限制同时在途的请求数，吞吐只受服务商限流约束而不受线程数约束
+- 每个服务商一个共享的自适应限流器 (rate_limiter.py)：令牌桶控制 RPM/TPM，
+  429 与 Retry-After 反馈给限流器统一降速/暂停，而不是每个请求各自 sleep
+- 其它错误线性退避；退避等待期间不占用并发名额
+- hedged(): 主服务商超过其 p90 耗时仍未返回时，向备用服务商补发一次请求，取先返回的结果
+- 可选流式模式 (SSE)：边收边拼接，超过 Token/时间预算时主动断开，
+  并按服务商统计首 Token 延迟 (TTFT) 与输出速度 (tokens/s)
+
+用法：
+    async with AsyncLLMClient(default_concurrency=100) as client:
+        content = await client.chat("deepseek", url, api_key, payload)
+        content = await client.chat("kimi", url, api_key, payload, stream=True, max_seconds=30)
+        print(client.stats_summary())
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+from rate_limiter import AdaptiveRateLimiter, DEFAULT_RPM, DEFAULT_TPM
+
+try:
+    import h2  # noqa: F401  (httpx 的 HTTP/2 支持依赖 h2)
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 每个服务商默认允许的同时在途请求数
+DEFAULT_CONCURRENCY = 100
+
+# 连接池上限 (所有服务商共用)
+MAX_CONNECTIONS = 1000
+
+
+# 对冲请求：样本数不足时使用的默认等待时间 (秒)，以及计算 p90 所需的最少样本数
+HEDGE_DEFAULT_DELAY = 15.0
+HEDGE_MIN_SAMPLES = 20
+
+# 未指定 max_tokens 时对输出 Token 数的预估
+DEFAULT_OUTPUT_TOKENS = 512
+
+
+class LLMError(Exception):
+    """请求在全部重试后仍然失败，异常信息为最后一次的错误描述"""
+
+
+class ProviderStats:
+    """单个服务商的调用统计：耗时、首 Token 延迟、输出速度、被预算截断的次数"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.ttfts = []
+        self.token_rates = []
+        self.truncated = 0
+
+    def record(self, latency, ttft=None, tokens=None, truncated=False):
+        self.latencies.append(latency)
+        if ttft is not None:
+            self.ttfts.append(ttft)
+            generation_time = latency - ttft
+            if tokens and generation_time > 0:
+                self.token_rates.append(tokens / generation_time)
+        if truncated:
+            self.truncated += 1
+
+    def percentile(self, values, q):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def hedge_delay(self):
+        """对冲等待时间：已有足够样本时取 p90 耗时，否则用默认值"""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return self.percentile(self.latencies, 0.9)
+
+    def summary(self):
+        text = f"{self.name}: {len(self.latencies)} 次, 平均耗时 {sum(self.latencies) / len(self.latencies):.2f}s"
+        if self.ttfts:
+            text += f", TTFT p50 {self.percentile(self.ttfts, 0.5):.2f}s"
+        if self.token_rates:
+            text += f", {sum(self.token_rates) / len(self.token_rates):.1f} tokens/s"
+        if self.truncated:
+            text += f", 预算截断 {self.truncated} 次"
+        return text
+
+
+def estimate_tokens(payload):
+    """粗略估算一次请求的 Token 消耗：输入按字符数计，加上输出上限"""
+    chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+    return chars + payload.get("max_tokens", DEFAULT_OUTPUT_TOKENS)
+
+
+def parse_retry_after(response):
+    """解析 Retry-After 响应头 (秒)，无法解析时返回 None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class AsyncLLMClient:
+    """连接池化的异步 OpenAI 兼容接口客户端"""
+
+    def __init__(
+        self,
+        default_concurrency=DEFAULT_CONCURRENCY,
+        concurrency=None,
+        rate_limits=None,
+        max_connections=MAX_CONNECTIONS,
+        timeout=60,
+    ):
+        """
+        concurrency: {provider: 同时在途请求数}
+        rate_limits: {provider: (RPM, TPM)}，TPM 可为 None
+        """
+        self.default_concurrency = default_concurrency
+        self.provider_concurrency = dict(concurrency or {})
+        self.rate_limits = dict(rate_limits or {})
+        self._semaphores = {}
+        self._limiters = {}
+        self.stats = {}
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60,
+        )
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def semaphore(self, provider):
+        """获取 (必要时创建) 某个服务商的并发信号量"""
+        if provider not in self._semaphores:
+            limit = self.provider_concurrency.get(provider, self.default_concurrency)
+            self._semaphores[provider] = asyncio.Semaphore(max(1, limit))
+        return self._semaphores[provider]
+
+    def limiter(self, provider):
+        """获取 (必要时创建) 某个服务商的限流器"""
+        if provider not in self._limiters:
+            rpm, tpm = self.rate_limits.get(provider, (DEFAULT_RPM, DEFAULT_TPM))
+            self._limiters[provider] = AdaptiveRateLimiter(provider, rpm, tpm)
+        return self._limiters[provider]
+
+    def rate_status(self):
+        """各服务商当前速率与排队深度，用于日志"""
+        return " | ".join(limiter.status() for limiter in self._limiters.values())
+
+    def provider_stats(self, provider):
+        if provider not in self.stats:
+            self.stats[provider] = ProviderStats(provider)
+        return self.stats[provider]
+
+    def stats_summary(self):
+        """各服务商的耗时 / TTFT / 输出速度统计，每个服务商一行"""
+        return "\n".join(
+            stats.summary() for stats in self.stats.values() if stats.latencies
+        )
+
+    async def hedged(self, primary, primary_call, backup_call=None, backup=None):
+        """
+        对冲请求：先调用 primary_call()；若超过 primary 服务商的 p90 耗时仍未返回 (或已失败)，
+        再调用 backup_call()，取先成功的结果并取消另一个。
+        两个调用都是返回 str 或抛出 LLMError 的无参协程函数。
+        返回 (结果, 实际给出结果的服务商名 primary 或 backup)。
+        """
+        if backup_call is None:
+            return await primary_call(), primary
+
+        first = asyncio.ensure_future(primary_call())
+        done, _ = await asyncio.wait(
+            {first}, timeout=self.provider_stats(primary).hedge_delay()
+        )
+        if done and first.exception() is None:
+            return first.result(), primary
+
+        second = asyncio.ensure_future(backup_call())
+        pending = {second}
+        if not done:
+            pending.add(first)
+        last_error = first.exception() if done else None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), (backup if task is second else primary)
+                    last_error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    async def _read_stream(self, response, started, max_tokens, max_seconds):
+        """
+        读取 SSE 流并拼接 delta.content。
+        返回 (content, usage, ttft, tokens, truncated)；超出预算时提前返回已收到的部分。
+        """
+        parts = []
+        usage = {}
+        ttft = None
+        tokens = 0
+        truncated = False
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            usage = chunk.get("usage") or usage
+            choices = chunk.get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if delta:
+                if ttft is None:
+                    ttft = time.monotonic() - started
+                parts.append(delta)
+                tokens += 1  # 每个 SSE 分片约为一个 Token
+            if (max_tokens and tokens >= max_tokens) or (
+                max_seconds and time.monotonic() - started >= max_seconds
+            ):
+                truncated = True
+                break
+        if usage.get("completion_tokens"):
+            tokens = usage["completion_tokens"]
+        return "".join(parts), usage, ttft, tokens, truncated
+
+    async def chat(
+        self,
+        provider,
+        url,
+        api_key,
+        payload,
+        retries=3,
+        timeout=60,
+        backoff=1.0,
+        stream=False,
+        max_tokens=None,
+        max_seconds=None,
+    ):
+        """
+        发送一次 chat/completions 请求并返回 message.content (保证为 str)。
+        stream=True 时以 SSE 流式接收，收到 max_tokens 个 Token 或耗时超过 max_seconds 秒即断开，
+        返回已生成的部分。全部重试失败后抛出 LLMError。
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}".strip(),
+        }
+        if stream:
+            payload = dict(payload, stream=True)
+            if max_tokens:
+                payload.setdefault("max_tokens", max_tokens)
+
+        limiter = self.limiter(provider)
+        stats = self.provider_stats(provider)
+        token_estimate = estimate_tokens(payload)
+
+        last_error = ""
+        for attempt in range(1, retries + 1):
+            await limiter.acquire(token_estimate)
+            response = None
+            content = None
+            async with self.semaphore(provider):
+                started = time.monotonic()
+                try:
+                    if stream:
+                        async with self._client.stream(
+                            "POST", url, headers=headers, json=payload, timeout=timeout
+                        ) as response:
+                            if response.status_code == 200:
+                                content, usage, ttft, tokens, truncated = (
+                                    await self._read_stream(
+                                        response, started, max_tokens, max_seconds
+                                    )
+                                )
+                    else:
+                        response = await self._client.post(
+                            url, headers=headers, json=payload, timeout=timeout
+                        )
+                except httpx.HTTPError as e:
+                    last_error = f"网络异常: {e!r}"
+                    response = None
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    last_error = f"响应格式异常: {e!r}"
+                    response = None
+
+            if response is not None:
+                if response.status_code == 200 and stream:
+                    if content:
+                        stats.record(
+                            time.monotonic() - started, ttft, tokens, truncated
+                        )
+                        limiter.on_success(token_estimate, usage.get("total_tokens"))
+                        return content
+                    last_error = "响应格式异常: 流式响应为空"
+                elif response.status_code == 200:
+                    try:
+                        data = response.json()
+                        content = data["choices"][0]["message"]["content"]
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        last_error = f"响应格式异常: {e!r}"
+                    else:
+                        # content 可能为 null (例如被内容审核拦截)，按格式异常重试
+                        if isinstance(content, str):
+                            stats.record(time.monotonic() - started)
+                            usage = data.get("usage") or {}
+                            limiter.on_success(
+                                token_estimate, usage.get("total_tokens")
+                            )
+                            return content
+                        last_error = f"响应格式异常: content={content!r}"
+                elif response.status_code == 429:
+                    # 交给共享限流器降速并暂停，下一次 acquire 会等到暂停结束
+                    last_error = "HTTP 429"
+                    limiter.on_throttle(
+                        parse_retry_after(response), default_pause=backoff * 2**attempt
+                    )
+                    continue
+                else:
+                    last_error = f"HTTP {response.status_code}"
+
+            if attempt < retries:
+                await asyncio.sleep(backoff * attempt)
+
+        raise LLMError(last_error)
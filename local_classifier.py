@@ -0,0 +1,297 @@
+"""
+本地预分类器 (questions_classification.py 的第一阶段)
+
+- KeywordClassifier: Aho-Corasick 多模式匹配，一次扫描题目即可找出所有关键词，
+  关键词直接映射到 CATEGORIES_PROMPT 中的精确分类名
+- TfidfClassifier: 可选，用总表中已分类的题目训练 TF-IDF + 逻辑回归 (需要 scikit-learn)
+- LocalClassifier: 先关键词、后模型，置信度达到阈值才在本地给出分类，其余交给 API
+"""
+
+import unicodedata
+from collections import deque
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+# 关键词 -> 分类 (分类名必须与 CATEGORIES_PROMPT 中的“编号 名称”完全一致)
+# 只收录指向性明确的词；容易跨类的词 (如“网络”“协议”“栈”“进程”“控制器”“检查点”“调制”)
+# 在通信、电网调度等题目里也常见，不收录，交给模型判断
+KEYWORD_RULES = {
+    "4 信道特性及复用、多址、均衡、分集技术": [
+        "多址",
+        "CDMA",
+        "TDMA",
+        "FDMA",
+        "OFDM",
+        "分集",
+        "信道均衡",
+        "时分复用",
+        "频分复用",
+    ],
+    "5 调制解调技术": ["数字调制", "解调", "ASK", "FSK", "PSK", "QPSK", "QAM"],
+    "7 信源编解码技术": ["信源编码", "PCM", "脉冲编码调制", "量化噪声"],
+    "8 信道编解码技术": [
+        "信道编码",
+        "卷积码",
+        "循环码",
+        "汉明码",
+        "LDPC",
+        "Turbo码",
+        "Polar码",
+    ],
+    "12 光纤传输技术（SDH、WDM、OTN、fgOTN、PTN）": [
+        "SDH",
+        "WDM",
+        "DWDM",
+        "OTN",
+        "fgOTN",
+        "PTN",
+        "波分复用",
+        "同步数字体系",
+        "光传送网",
+    ],
+    "13 光纤的结构与特性、光缆结构": ["单模光纤", "多模光纤", "光缆", "纤芯", "包层"],
+    "16 接入技术（光纤接入 PON、无线接入）": [
+        "PON",
+        "EPON",
+        "GPON",
+        "光纤接入",
+        "ONU",
+        "OLT",
+    ],
+    "19 交换技术（电路交换、分组交换、ATM）": ["电路交换", "分组交换", "ATM信元"],
+    "23 数据网新技术基础（MPLS，IPv6，SDN）": ["MPLS", "IPv6", "SDN"],
+    "26 5G/6G 移动通信关键技术基础": ["5G", "6G", "毫米波", "Massive MIMO", "网络切片"],
+    "27 卫星通信基础及应用": ["卫星通信", "VSAT", "同步轨道卫星"],
+    "28 基于 H.320、H.323、SIP 协议的会议电视系统": [
+        "H.320",
+        "H.323",
+        "会议电视",
+        "视频会议",
+    ],
+    "29 电力线载波通信": ["电力线载波", "载波通信"],
+    "2 线性表": ["线性表", "链表", "顺序表", "头指针", "头结点"],
+    "3 栈和队列": ["出栈", "入栈", "进栈", "栈顶", "循环队列", "队头", "队尾"],
+    "5 树和二叉树": [
+        "二叉树",
+        "哈夫曼树",
+        "先序遍历",
+        "中序遍历",
+        "后序遍历",
+        "叶子结点",
+    ],
+    "6 图": [
+        "邻接矩阵",
+        "邻接表",
+        "最小生成树",
+        "拓扑排序",
+        "关键路径",
+        "Dijkstra",
+        "Prim",
+        "Kruskal",
+    ],
+    "7 查找": ["折半查找", "二分查找", "散列表", "哈希表", "B+树", "平均查找长度"],
+    "8 内部排序": [
+        "冒泡排序",
+        "快速排序",
+        "堆排序",
+        "归并排序",
+        "希尔排序",
+        "插入排序",
+        "选择排序",
+        "基数排序",
+    ],
+    "12 关系数据库标准语言 SQL": ["SQL", "SELECT", "GROUP BY", "INSERT INTO"],
+    "13 事务处理和并发控制": ["封锁协议", "两段锁", "并发控制", "ACID", "脏读"],
+    "14 备份和恢复": ["数据库备份", "数据库恢复", "数据转储", "介质故障"],
+    "20 传输层": ["三次握手", "四次挥手", "拥塞控制", "UDP", "滑动窗口"],
+    "21 应用层": ["HTTP", "DNS", "SMTP", "FTP", "DHCP", "POP3"],
+    "25 进程与线程管理": [
+        "死锁",
+        "PV操作",
+        "银行家算法",
+        "临界区",
+        "进程同步",
+        "进程控制块",
+    ],
+    "26 内存管理": ["页面置换", "虚拟内存", "缺页", "快表", "TLB", "页表"],
+    "34 中央处理器": ["指令流水线", "指令周期", "微程序", "运算器"],
+    "39 常见软件开发方法": ["敏捷开发", "Scrum", "瀑布模型", "螺旋模型", "原型法"],
+    "43 软件测试": ["白盒测试", "黑盒测试", "单元测试", "集成测试", "回归测试"],
+    "45 人工智能基础": ["人工智能", "机器学习", "神经网络", "深度学习"],
+    "47 大数据基础": ["大数据", "Hadoop", "MapReduce", "Spark", "HDFS"],
+}
+
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", str(text)).lower()
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机：一次扫描找出文本中出现的所有模式串"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+    def add(self, pattern, value):
+        node = 0
+        for ch in pattern:
+            if ch not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][ch] = len(self.goto) - 1
+            node = self.goto[node][ch]
+        self.output[node].append((pattern, value))
+
+    def build(self):
+        """按 BFS 计算失配指针，并把失配链上的输出合并到当前节点"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                if self.fail[child] == child:
+                    self.fail[child] = 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, text):
+        """产出 (结束位置, 模式串, 值)"""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for pattern, value in self.output[node]:
+                yield i, pattern, value
+
+
+def is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class KeywordClassifier:
+    """关键词规则分类：命中关键词越多、越集中于同一分类，置信度越高"""
+
+    def __init__(self, rules=KEYWORD_RULES):
+        self.automaton = AhoCorasick()
+        for category, keywords in rules.items():
+            for keyword in keywords:
+                self.automaton.add(normalize(keyword), category)
+        self.automaton.build()
+
+    def predict(self, text):
+        """返回 (分类, 置信度)，没有命中任何关键词时返回 (None, 0.0)"""
+        text = normalize(text)
+        scores = {}
+        hits = {}
+        matched = set()
+        for end, pattern, category in self.automaton.iter_matches(text):
+            start = end - len(pattern) + 1
+            # 英文缩写要求整词匹配，避免 ASK 命中 task、RIP 命中 trip
+            if pattern.isascii() and (
+                (
+                    start > 0
+                    and is_word_char(text[start - 1])
+                    and is_word_char(pattern[0])
+                )
+                or (
+                    end + 1 < len(text)
+                    and is_word_char(text[end + 1])
+                    and is_word_char(pattern[-1])
+                )
+            ):
+                continue
+            if (pattern, category) in matched:
+                continue
+            matched.add((pattern, category))
+            scores[category] = scores.get(category, 0) + len(pattern)
+            hits[category] = hits.get(category, 0) + 1
+
+        if not scores:
+            return None, 0.0
+        best = max(scores, key=scores.get)
+        # 集中度 (最高分类的得分占比) × 命中数饱和项 (1 个词 0.5，2 个 0.75，3 个 0.875 ...)
+        # 只命中一个词时低于默认阈值，至少两个关键词一致才在本地定类
+        share = scores[best] / sum(scores.values())
+        return best, share * (1 - 0.5 ** hits[best])
+
+
+class TfidfClassifier:
+    """字符 n-gram TF-IDF + 逻辑回归，用总表中已分类的题目训练"""
+
+    MIN_SAMPLES = 200
+
+    def __init__(self):
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb", ngram_range=(2, 4), min_df=2, sublinear_tf=True
+        )
+        self.model = LogisticRegression(max_iter=1000)
+        self.trained = False
+
+    def fit(self, texts, labels):
+        texts = [normalize(t) for t in texts]
+        if len(texts) < self.MIN_SAMPLES or len(set(labels)) < 2:
+            return False
+        self.model.fit(self.vectorizer.fit_transform(texts), labels)
+        self.trained = True
+        return True
+
+    def predict_many(self, texts):
+        """返回 [(分类, 置信度)]"""
+        if not self.trained or not texts:
+            return [(None, 0.0)] * len(texts)
+        proba = self.model.predict_proba(
+            self.vectorizer.transform([normalize(t) for t in texts])
+        )
+        best = proba.argmax(axis=1)
+        return [
+            (self.model.classes_[i], float(proba[row, i])) for row, i in enumerate(best)
+        ]
+
+
+class LocalClassifier:
+    """先关键词、后 TF-IDF 模型；置信度不低于 threshold 的题目在本地分类"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.keywords = KeywordClassifier()
+        self.tfidf = TfidfClassifier() if SKLEARN_AVAILABLE else None
+        self.stats = {"keyword": 0, "model": 0}
+
+    def train(self, texts, labels):
+        """用已分类题目训练模型；未安装 scikit-learn 或样本不足时返回 False"""
+        if self.tfidf is None:
+            return False
+        return self.tfidf.fit(texts, labels)
+
+    def classify_many(self, texts):
+        """返回与 texts 等长的列表，本地有把握的位置为分类名，其余为 None"""
+        results = [None] * len(texts)
+        undecided = []
+        for i, text in enumerate(texts):
+            category, confidence = self.keywords.predict(text)
+            if category and confidence >= self.threshold:
+                results[i] = category
+                self.stats["keyword"] += 1
+            else:
+                undecided.append(i)
+
+        if self.tfidf is not None and self.tfidf.trained and undecided:
+            predictions = self.tfidf.predict_many([texts[i] for i in undecided])
+            for i, (category, confidence) in zip(undecided, predictions):
+                if confidence >= self.threshold:
+                    results[i] = category
+                    self.stats["model"] += 1
+        return results
@@ -3,18 +3,23 @@
 """
 Excel 同名文件合并工具
 --------------------------------------------------
-功能：比较两个文件夹，找出文件名相同的 Excel 文件，
+功能：比较两个或多个文件夹，找出文件名相同的 Excel 文件，
       将它们的内容垂直合并（追加），并保存到指定输出目录。
 
 用法示例：
     python merge_excel_cli.py -a "path/to/folder_A" -b "path/to/folder_B" -o "path/to/output"
+    python merge_excel_cli.py --dirs 南网 国网通信 国网计算机 --mode union --jobs 4 -o "path/to/output"
 """
 
 import os
 import argparse
+import openpyxl
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Set, List
+from typing import Dict, Set, List, Optional
+
+from text_dedup import DuplicateIndex
 
 
 def parse_args():
@@ -42,6 +47,46 @@ def parse_args():
         help="输入文件夹 B 的路径 (要追加的数据)",
     )
 
+    parser.add_argument(
+        "--dirs",
+        type=str,
+        nargs="+",
+        default=None,
+        help="任意数量的输入文件夹 (按顺序上下拼接)，指定后忽略 -a / -b",
+    )
+
+    parser.add_argument(
+        "--mode",
+        choices=["intersection", "union"],
+        default="intersection",
+        help="intersection: 只合并所有文件夹都有的同名文件 (默认)\n"
+        "union: 合并任一文件夹中出现的文件，缺少该文件的文件夹跳过",
+    )
+
+    parser.add_argument(
+        "--dedup",
+        choices=["none", "drop", "flag"],
+        default="none",
+        help="按 题目名称 + 选项 去重：none 不去重 (默认)；drop 删除重复行；\n"
+        "flag 保留重复行，在“重复标记”列注明与第几行重复",
+    )
+
+    parser.add_argument(
+        "--near-dup",
+        type=float,
+        default=None,
+        metavar="THRESHOLD",
+        help="同时用 MinHash/LSH 检测近似重复 (改写过的同一道题)，参数为相似度阈值，如 0.8",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="并行进程数 (默认1)",
+    )
+
     parser.add_argument(
         "-o",
         "--output",
@@ -50,9 +95,22 @@ def parse_args():
         help="输出结果文件夹的路径",
     )
 
+    parser.add_argument(
+        "--engine",
+        choices=["stream", "pandas"],
+        default="stream",
+        help="stream: openpyxl 只读/只写模式逐行复制，内存占用恒定 (默认)\n"
+        "pandas: 整表读入 DataFrame 后合并 (.xls 文件总是使用该方式)",
+    )
+
     return parser.parse_args()
 
 
+def dir_label(index: int) -> str:
+    """输入文件夹在日志中的标签：A、B、C ... 超过 26 个时用序号"""
+    return chr(ord("A") + index) if index < 26 else f"#{index + 1}"
+
+
 def get_excel_filenames(folder_path: Path) -> Set[str]:
     """
     获取指定文件夹下所有有效 Excel 文件名的集合。
@@ -76,71 +134,323 @@ def get_excel_filenames(folder_path: Path) -> Set[str]:
     return filenames
 
 
-def merge_files(dir_a: Path, dir_b: Path, output_dir: Path):
+# 题目列的候选列名 (按优先级)，选项列为所有以“选项”开头的列
+QUESTION_COLUMNS = ["题目名称", "题目", "题干"]
+FLAG_COLUMN = "重复标记"
+
+
+class RowDeduper:
     """
-    执行文件合并的核心逻辑
+    合并时的题目去重：以 规范化后的题目 + 选项 建立哈希索引 (可选 MinHash/LSH 近似重复)。
+    check() 返回重复说明文字，未重复时返回 None。
     """
-    # 1. 获取文件列表
-    print(f"正在扫描文件夹 A: {dir_a}")
-    files_a = get_excel_filenames(dir_a)
 
-    print(f"正在扫描文件夹 B: {dir_b}")
-    files_b = get_excel_filenames(dir_b)
+    def __init__(self, columns: List[str], near_threshold: Optional[float] = None):
+        self.question_pos = next(
+            (columns.index(name) for name in QUESTION_COLUMNS if name in columns), None
+        )
+        self.option_pos = [
+            i for i, name in enumerate(columns) if name.startswith("选项")
+        ]
+        self.index = DuplicateIndex(near_threshold)
+        self.exact_count = 0
+        self.near_count = 0
+
+    def check(self, row: list, row_number: int) -> Optional[str]:
+        if self.question_pos is None:
+            return None
+        question = row[self.question_pos]
+        if question is None or pd.isna(question) or not str(question).strip():
+            return None
+        options = [
+            str(row[i])
+            for i in self.option_pos
+            if row[i] is not None and not pd.isna(row[i])
+        ]
+        found = self.index.check("\n".join([str(question)] + options), row_number)
+        if found is None:
+            return None
+        kind, ref, similarity = found
+        if kind == "exact":
+            self.exact_count += 1
+            return f"完全重复: 第{ref}行"
+        self.near_count += 1
+        return f"近似重复({similarity:.2f}): 第{ref}行"
+
+    def stats(self) -> dict:
+        return {"exact": self.exact_count, "near": self.near_count}
+
+
+def dedup_names(names: List[str]) -> List[str]:
+    """重名列按 pandas 的规则改名 (选项, 选项.1, 选项.2 ...)，避免后一列覆盖前一列"""
+    original = set(names)
+    counts: Dict[str, int] = {}
+    result = []
+    for name in names:
+        base = name
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[base] = count + 1
+            name = f"{base}.{count}"
+            # 表头里本来就有的名字 (如另一列就叫 选项.1) 不能再占用
+            count = count + 1 if name in original else counts.get(name, 0)
+        result.append(name)
+        counts[name] = count + 1
+    return result
+
+
+def read_header(file_path: Path) -> List[str]:
+    """
+    只读取第一行作为表头，与 pd.read_excel 的列名一致：
+    空表头命名为 Unnamed: n，重名表头依次加 .1、.2 后缀
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        first_row = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    return dedup_names(
+        [
+            str(value) if value is not None else f"Unnamed: {i}"
+            for i, value in enumerate(first_row)
+        ]
+    )
 
-    # 2. 取交集（找出两边都有的文件）
-    common_files = files_a.intersection(files_b)
 
-    if not common_files:
-        print("\n⚠️  未在两个文件夹中找到同名的 Excel 文件，程序结束。")
+def stream_merge(
+    input_paths: List[Path],
+    output_path: Path,
+    dedup: str = "none",
+    near_threshold: Optional[float] = None,
+):
+    """
+    流式合并：依次逐行复制各文件的数据行到同一个 write_only 工作簿。
+    列取所有文件表头的并集 (按出现顺序)，按列名对齐；内存中只保留当前一行 (去重时另有哈希索引)。
+    返回 (每个输入文件的数据行数, 去重统计)。
+    """
+    headers = [read_header(path) for path in input_paths]
+    columns: List[str] = []
+    for header in headers:
+        for name in header:
+            if name not in columns:
+                columns.append(name)
+    column_index = {name: i for i, name in enumerate(columns)}
+
+    deduper = RowDeduper(columns, near_threshold) if dedup != "none" else None
+
+    out_wb = openpyxl.Workbook(write_only=True)
+    out_ws = out_wb.create_sheet()
+    out_ws.append(columns + [FLAG_COLUMN] if dedup == "flag" else columns)
+    # 下一行写入后在输出文件中的行号 (第 1 行是表头)
+    next_row = 2
+
+    row_counts = []
+    for path, header in zip(input_paths, headers):
+        positions = [column_index[name] for name in header]
+        count = 0
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            for values in wb.active.iter_rows(min_row=2, values_only=True):
+                if all(value is None for value in values):
+                    continue
+                row = [None] * len(columns)
+                for pos, value in zip(positions, values):
+                    row[pos] = value
+                count += 1
+                if deduper is not None:
+                    flag = deduper.check(row, next_row)
+                    if dedup == "drop" and flag:
+                        continue
+                    if dedup == "flag":
+                        row.append(flag)
+                out_ws.append(row)
+                next_row += 1
+        finally:
+            wb.close()
+        row_counts.append(count)
+
+    out_wb.save(output_path)
+    return row_counts, deduper.stats() if deduper else {}
+
+
+def pandas_merge(
+    input_paths: List[Path],
+    output_path: Path,
+    dedup: str = "none",
+    near_threshold: Optional[float] = None,
+):
+    """
+    整表读入后 concat 合并 (sort=False 防止列名顺序改变)
+    返回 (每个输入文件的行数, 去重统计)
+    """
+    frames = [pd.read_excel(path) for path in input_paths]
+    merged_df = pd.concat(frames, ignore_index=True, sort=False)
+
+    stats = {}
+    if dedup != "none":
+        deduper = RowDeduper(list(merged_df.columns), near_threshold)
+        flags = []
+        next_row = 2
+        for row in merged_df.itertuples(index=False):
+            flag = deduper.check(list(row), next_row)
+            flags.append(flag)
+            if not (dedup == "drop" and flag):
+                next_row += 1
+        if dedup == "drop":
+            merged_df = merged_df[[flag is None for flag in flags]]
+        else:
+            merged_df[FLAG_COLUMN] = flags
+        stats = deduper.stats()
+
+    merged_df.to_excel(output_path, index=False)
+    return [len(df) for df in frames], stats
+
+
+def merge_one(
+    input_paths: List[Path],
+    output_path: Path,
+    engine: str,
+    dedup: str = "none",
+    near_threshold: Optional[float] = None,
+):
+    """合并一组同名文件；openpyxl 无法读取 .xls，遇到 .xls 时退回 pandas"""
+    if engine == "stream" and all(
+        path.suffix.lower() == ".xlsx" for path in input_paths
+    ):
+        return stream_merge(input_paths, output_path, dedup, near_threshold)
+    return pandas_merge(input_paths, output_path, dedup, near_threshold)
+
+
+def merge_task(
+    filename: str,
+    input_paths: List[Path],
+    output_path: Path,
+    engine: str,
+    dedup: str = "none",
+    near_threshold: Optional[float] = None,
+):
+    """
+    进程池中执行的任务：合并一组同名文件
+    返回 (文件名, 各输入文件行数, 去重统计, 错误信息)
+    """
+    try:
+        counts, stats = merge_one(
+            input_paths, output_path, engine, dedup, near_threshold
+        )
+        return filename, counts, stats, None
+    except Exception as e:
+        return filename, [], {}, str(e)
+
+
+def merge_files(
+    input_dirs: List[Path],
+    output_dir: Path,
+    engine: str = "stream",
+    mode: str = "intersection",
+    jobs: int = 1,
+    dedup: str = "none",
+    near_threshold: Optional[float] = None,
+):
+    """
+    执行文件合并的核心逻辑
+    input_dirs: 任意数量的输入文件夹，按顺序上下拼接
+    mode: intersection 只合并所有文件夹都有的文件名；union 合并任一文件夹中出现的文件名
+    """
+    # 1. 获取文件列表
+    files_by_dir = []
+    for idx, folder in enumerate(input_dirs):
+        print(f"正在扫描文件夹 {dir_label(idx)}: {folder}")
+        files_by_dir.append(get_excel_filenames(folder))
+
+    # 2. 取交集（找出每个文件夹都有的文件）或并集
+    if mode == "union":
+        target_files = set().union(*files_by_dir)
+    else:
+        target_files = set.intersection(*files_by_dir)
+
+    if not target_files:
+        print("\n⚠️  未在输入文件夹中找到需要合并的 Excel 文件，程序结束。")
         return
 
-    print(f"\n✅ 找到 {len(common_files)} 个同名文件，准备合并...")
+    print(f"\n✅ 找到 {len(target_files)} 个文件名，准备合并...")
 
     # 3. 确保输出目录存在
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # 4. 遍历处理
+    # 4. 生成任务：每个文件名对应 有该文件的文件夹 (保持输入顺序)
+    tasks = []
+    for filename in sorted(target_files):
+        sources = [
+            (dir_label(idx), folder / filename)
+            for idx, (folder, names) in enumerate(zip(input_dirs, files_by_dir))
+            if filename in names
+        ]
+        tasks.append((filename, sources))
+
     success_count = 0
     fail_count = 0
+    dup_totals = {"exact": 0, "near": 0}
 
-    for idx, filename in enumerate(common_files, 1):
-        file_path_a = dir_a / filename
-        file_path_b = dir_b / filename
-        output_path = output_dir / filename
-
-        print(f"[{idx}/{len(common_files)}] 处理: {filename}")
-
-        try:
-            # 读取数据
-            # 使用 keep_default_na=True 保持默认空值处理
-            df_a = pd.read_excel(file_path_a)
-            df_b = pd.read_excel(file_path_b)
-
-            # 记录原始行数
-            len_a = len(df_a)
-            len_b = len(df_b)
-
-            # 合并数据 (A 在上，B 在下)
-            # sort=False 防止列名顺序改变
-            merged_df = pd.concat([df_a, df_b], ignore_index=True, sort=False)
-
-            # 保存数据
-            merged_df.to_excel(output_path, index=False)
-
+    def report(idx, filename, sources, counts, stats, error):
+        nonlocal success_count, fail_count
+        print(f"[{idx}/{len(tasks)}] 处理: {filename}")
+        if error:
+            print(f"   -> ❌ 失败: {error}")
+            fail_count += 1
+            return
+        parts = " + ".join(
+            f"{label}({count}行)" for (label, _), count in zip(sources, counts)
+        )
+        print(f"   -> 合并成功: {parts} = 总计({sum(counts)}行)")
+        if stats:
+            action = "已删除" if dedup == "drop" else "已标记"
             print(
-                f"   -> 合并成功: A({len_a}行) + B({len_b}行) = 总计({len(merged_df)}行)"
+                f"   -> 去重: 完全重复 {stats['exact']} 行, "
+                f"近似重复 {stats['near']} 行 ({action})"
             )
-            success_count += 1
-
-        except Exception as e:
-            print(f"   -> ❌ 失败: {str(e)}")
-            fail_count += 1
+            for key in dup_totals:
+                dup_totals[key] += stats[key]
+        success_count += 1
+
+    # 5. 遍历处理 (jobs > 1 时用进程池并行，openpyxl 读写是 CPU 密集型)
+    if jobs > 1:
+        sources_by_name = dict(tasks)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(
+                    merge_task,
+                    filename,
+                    [path for _, path in sources],
+                    output_dir / filename,
+                    engine,
+                    dedup,
+                    near_threshold,
+                )
+                for filename, sources in tasks
+            ]
+            for idx, future in enumerate(as_completed(futures), 1):
+                filename, counts, stats, error = future.result()
+                report(idx, filename, sources_by_name[filename], counts, stats, error)
+    else:
+        for idx, (filename, sources) in enumerate(tasks, 1):
+            _, counts, stats, error = merge_task(
+                filename,
+                [path for _, path in sources],
+                output_dir / filename,
+                engine,
+                dedup,
+                near_threshold,
+            )
+            report(idx, filename, sources, counts, stats, error)
 
-    # 5. 总结
+    # 6. 总结
     print("\n" + "=" * 30)
     print(f"处理完成！")
     print(f"成功: {success_count}")
     print(f"失败: {fail_count}")
+    if dedup != "none":
+        print(f"完全重复: {dup_totals['exact']} 行")
+        print(f"近似重复: {dup_totals['near']} 行")
     print(f"结果保存在: {output_dir.resolve()}")
     print("=" * 30)
 
@@ -149,13 +459,20 @@ def main():
     # 1. 解析参数
     args = parse_args()
 
-    # 2. 转换为 Path 对象，方便操作
-    path_a = Path(args.dir_a)
-    path_b = Path(args.dir_b)
+    # 2. 转换为 Path 对象，方便操作；指定了 --dirs 时忽略 -a / -b
+    input_dirs = [Path(d) for d in (args.dirs or [args.dir_a, args.dir_b])]
     path_out = Path(args.output)
 
     # 3. 执行合并
-    merge_files(path_a, path_b, path_out)
+    merge_files(
+        input_dirs,
+        path_out,
+        args.engine,
+        args.mode,
+        max(1, args.jobs),
+        args.dedup,
+        args.near_dup,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""
+Parquet 列式缓存 (data_analysis.py / questions_classification.py 共用)
+
+CSV / xlsx 每次运行都要重新解析文本或 XML，题库和考试记录一多就要几分钟。
+read_cached 第一次读取某个文件时把解析结果存成 Parquet，之后直接读缓存：
+- 缓存按 绝对路径 + 文件大小 + 修改时间 寻址，源文件一改动自动失效并覆盖旧缓存
+- 支持列投影，只读取需要的列
+- 同一列混有数字和文本 (如题号列里夹着“附加题”) 时转成文本再缓存
+- 需要 pyarrow (pip install pyarrow)；未安装时退化为直接读取源文件
+"""
+
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CACHE_DIR = ".parquet_cache"
+
+_warned = False
+
+
+def cache_path(path, cache_dir=CACHE_DIR):
+    """同一源文件的缓存共用前缀 (路径哈希)，后缀为 大小_修改时间"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    prefix = hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(
+        cache_dir, f"{prefix}_{stat.st_size}_{stat.st_mtime_ns}.parquet"
+    )
+
+
+def _select(names, columns):
+    """columns 可以是列名列表或 判断函数 (与 read_csv/read_excel 的 usecols 相同)"""
+    if callable(columns):
+        return [c for c in names if columns(c)]
+    return [c for c in columns if c in names]
+
+
+def _project(df, columns):
+    if columns is None:
+        return df
+    return df[_select(df.columns, columns)]
+
+
+def _stringify_mixed(df):
+    """
+    Arrow 要求一列只有一种类型：object 列混有数字、文本等多种类型时统一转成文本，
+    空值保持不变。首次读取也返回转换后的结果，保证有无缓存时得到的数据一致
+    """
+    for col in df.columns:
+        series = df[col]
+        if series.dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind.startswith("mixed") and kind != "mixed-integer-float":
+            df[col] = series.where(series.isna(), series.astype(str))
+    return df
+
+
+def read_cached(path, reader, columns=None, cache_dir=CACHE_DIR):
+    """
+    读取 path：有有效缓存时读 Parquet (只读 columns 选中的列)，否则调用 reader(path)
+    解析完整源文件并写入缓存。cache_dir 为 None 或未安装 pyarrow 时不使用缓存，
+    改为 reader(path, usecols=columns) 让解析器直接跳过不需要的列。
+    返回 (DataFrame, 是否命中缓存)
+    """
+    global _warned
+    if cache_dir is None or not PARQUET_AVAILABLE:
+        if cache_dir is not None and not _warned:
+            print("⚠️ 未安装 pyarrow，Parquet 缓存不可用，直接读取源文件")
+            _warned = True
+        if columns is None:
+            return reader(path), False
+        return reader(path, usecols=columns), False
+
+    target = cache_path(path, cache_dir)
+    if os.path.exists(target):
+        try:
+            if columns is not None:
+                columns = _select(pq.read_schema(target).names, columns)
+            return pd.read_parquet(target, columns=columns), True
+        except Exception as e:
+            print(f"⚠️ 缓存损坏，重新读取 {os.path.basename(path)}: {e}")
+
+    df = _stringify_mixed(reader(path))
+    os.makedirs(cache_dir, exist_ok=True)
+    # 清理同一源文件的旧版本缓存
+    prefix = os.path.basename(target).rsplit("_", 2)[0]
+    for stale in glob.glob(os.path.join(cache_dir, f"{prefix}_*.parquet")):
+        if stale != target:
+            os.remove(stale)
+    tmp_path = target + ".tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, target)
+    except Exception as e:
+        # 其余 Arrow 无法表示的情况 (如数字列名)：本次不缓存，数据照常返回
+        print(f"⚠️ 无法缓存 {os.path.basename(path)}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return _project(df, columns), False
@@ -0,0 +1,284 @@
+"""
+全题库近似重复检测
+基于 MinHash/LSH (text_dedup.py)，复用 questions_classification.py 的读取逻辑：
+1. 读取文件/文件夹下的所有题库，按 题目名称 + 选项 规范化后建立索引
+2. 完全相同的题目直接合并；改写过的题目通过 LSH 分桶找候选，只与同桶题目比较 (近线性复杂度)
+3. 重复关系用并查集合并成重复簇，输出到 Excel
+4. 索引持久化到本地文件，下次运行只处理新增题目
+command: python question_dedup.py -i ./题库 --threshold 0.8
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import pandas as pd
+
+from questions_classification import (
+    QUESTION_COLUMN,
+    get_all_excel_files,
+    load_and_merge_data,
+)
+from text_dedup import (
+    DEFAULT_NGRAM,
+    DEFAULT_NUM_PERM,
+    LSHIndex,
+    MinHasher,
+    UnionFind,
+    estimate_similarity,
+    normalize_text,
+    text_key,
+)
+
+# ================= 配置区域 =================
+INDEX_FILE = "题库_去重索引.pkl"
+OUTPUT_FILE = "题库_重复簇.xlsx"
+NEAR_THRESHOLD = 0.8
+INDEX_VERSION = (
+    2  # 2: 来源文件按绝对路径记录 (旧索引按文件名，不同文件夹的同名文件会混在一起)
+)
+
+parser = argparse.ArgumentParser(description="全题库近似重复检测")
+parser.add_argument(
+    "-i",
+    "--input",
+    type=str,
+    default=r"E:\my_script\专业知识 南方电网通信计算机类题库",
+    help="输入的文件路径 或 文件夹路径",
+)
+parser.add_argument(
+    "-o", "--output", type=str, default=OUTPUT_FILE, help="重复簇输出文件 (xlsx)"
+)
+parser.add_argument("--index", type=str, default=INDEX_FILE, help="持久化索引文件路径")
+parser.add_argument(
+    "--threshold",
+    type=float,
+    default=NEAR_THRESHOLD,
+    help="近似重复的相似度阈值 (字符三元组 Jaccard，默认0.8)",
+)
+parser.add_argument("--rebuild", action="store_true", help="忽略已有索引，从头重建")
+
+
+class QuestionIndex:
+    """
+    可增量更新的题目索引：
+    entries: 规范化文本哈希 -> {题目, 来源文件绝对路径: 出现次数}
+    lsh / signatures: 近似重复查找
+    clusters: 并查集记录的重复关系
+    """
+
+    def __init__(self, threshold, num_perm=DEFAULT_NUM_PERM, ngram=DEFAULT_NGRAM):
+        self.params = {
+            "threshold": threshold,
+            "num_perm": num_perm,
+            "ngram": ngram,
+            "version": INDEX_VERSION,
+        }
+        self.hasher = MinHasher(num_perm, ngram)
+        self.lsh = LSHIndex(num_perm, threshold)
+        self.signatures = {}
+        self.entries = {}
+        self.clusters = UnionFind()
+        self.similarity = {}  # key -> 与所并入簇中最相近题目的相似度
+        self.seen_files = {}  # 文件绝对路径 -> (大小, 修改时间)
+
+    @classmethod
+    def load(cls, path, threshold):
+        """读取已有索引；参数不一致或文件损坏时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                index = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ 索引文件无法读取，将重建: {e}")
+            return None
+        if index.params.get("version") != INDEX_VERSION:
+            print("⚠️ 索引格式已更新，将重建索引")
+            return None
+        if index.params.get("threshold") != threshold:
+            print("⚠️ 阈值与已有索引不一致，将重建索引")
+            return None
+        return index
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def add(self, text, question, source):
+        """加入一道题，返回 "exact" / "near" / "new" """
+        key = text_key(text)
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["sources"][source] = entry["sources"].get(source, 0) + 1
+            return "exact"
+
+        self.entries[key] = {"question": question, "sources": {source: 1}}
+        signature = self.hasher.signature(text)
+        threshold = self.params["threshold"]
+        result = "new"
+        for candidate in self.lsh.query(signature):
+            similarity = estimate_similarity(signature, self.signatures[candidate])
+            if similarity >= threshold:
+                self.clusters.union(candidate, key)
+                self.similarity[key] = max(self.similarity.get(key, 0), similarity)
+                result = "near"
+        self.signatures[key] = signature
+        self.lsh.insert(key, signature)
+        return result
+
+    def forget_source(self, source):
+        """文件被修改后重新收录前，先扣除该文件之前贡献的出现次数"""
+        for entry in self.entries.values():
+            entry["sources"].pop(source, None)
+
+    def occurrences(self, key):
+        return sum(self.entries[key]["sources"].values())
+
+    def duplicate_clusters(self):
+        """
+        所有重复簇：近似重复的题目并成一个簇；同一道题被多次收录也算一个簇
+        (已不在任何文件中出现的题目不计入)
+        返回 [(代表 key, [成员 key...])]，按簇内题目总数从大到小排序
+        """
+        groups = []
+        grouped = set()
+        for members in self.clusters.clusters().values():
+            grouped.update(members)
+            live = [key for key in members if self.occurrences(key)]
+            if len(live) > 1 or (live and self.occurrences(live[0]) > 1):
+                groups.append((live[0], live))
+        for key in self.entries:
+            if key not in grouped and self.occurrences(key) > 1:
+                groups.append((key, [key]))
+
+        def total(members):
+            return sum(self.occurrences(k) for k in members)
+
+        return sorted(groups, key=lambda item: total(item[1]), reverse=True)
+
+
+def dedup_columns(column):
+    """去重只需要题目和选项列 (模块级函数，可传给进程池)"""
+    column = str(column)
+    return column == QUESTION_COLUMN or column.startswith("选项")
+
+
+def question_text(row, option_columns):
+    """参与比较的文本：题目 + 各选项"""
+    parts = [str(row[QUESTION_COLUMN])]
+    for col in option_columns:
+        value = row[col]
+        if pd.notna(value) and str(value).strip():
+            parts.append(str(value))
+    return "\n".join(parts)
+
+
+def export_clusters(index, clusters, output_path):
+    rows = []
+    for cluster_id, (root, members) in enumerate(clusters, 1):
+        size = sum(index.occurrences(k) for k in members)
+        representative = index.entries[root]["question"]
+        for key in members:
+            entry = index.entries[key]
+            rows.append(
+                {
+                    "簇编号": cluster_id,
+                    "簇内题目数": size,
+                    "代表题目": representative,
+                    QUESTION_COLUMN: entry["question"],
+                    "相似度": (
+                        1.0 if key == root else round(index.similarity.get(key, 1.0), 3)
+                    ),
+                    "出现次数": index.occurrences(key),
+                    "来源文件": "; ".join(
+                        f"{name}×{count}" if count > 1 else name
+                        for name, count in entry["sources"].items()
+                    ),
+                }
+            )
+    pd.DataFrame(rows).to_excel(output_path, index=False)
+
+
+def main():
+    config = parser.parse_args()
+
+    # 输出文件可能就在输入文件夹里，不能把它当成题库读入
+    output_path = os.path.abspath(config.output)
+    files = [
+        f
+        for f in get_all_excel_files(config.input)
+        if os.path.abspath(f) != output_path
+    ]
+    if not files:
+        return
+
+    index = (
+        None if config.rebuild else QuestionIndex.load(config.index, config.threshold)
+    )
+    if index is None:
+        index = QuestionIndex(config.threshold)
+    else:
+        print(f"♻️ 载入已有索引: {len(index.entries)} 道不同题目")
+
+    # 已收录过且未修改的文件 (按 大小+修改时间 判断) 不再重复计数
+    # 来源按绝对路径区分，不同文件夹下的同名文件各算各的
+    pending = {}
+    for f in files:
+        stat = os.stat(f)
+        signature = (stat.st_size, stat.st_mtime)
+        path = os.path.abspath(f)
+        if index.seen_files.get(path) != signature:
+            if path in index.seen_files:
+                index.forget_source(path)
+            pending[path] = signature
+    print(f"共 {len(files)} 个文件，其中 {len(pending)} 个新增或已修改")
+
+    if pending:
+        df = load_and_merge_data(
+            list(pending), columns=dedup_columns, source=os.path.abspath
+        )
+        # 只记录成功读入的文件，读取失败的下次运行会重试
+        loaded = set(df["来源文件"]) if not df.empty else set()
+        for path in loaded:
+            index.seen_files[path] = pending[path]
+        if not df.empty:
+            option_columns = [c for c in df.columns if str(c).startswith("选项")]
+            counts = {"new": 0, "exact": 0, "near": 0}
+            start = time.perf_counter()
+            for _, row in df.iterrows():
+                if pd.isna(row[QUESTION_COLUMN]) or not normalize_text(
+                    row[QUESTION_COLUMN]
+                ):
+                    continue
+                text = question_text(row, option_columns)
+                result = index.add(text, str(row[QUESTION_COLUMN]), row["来源文件"])
+                counts[result] += 1
+            elapsed = time.perf_counter() - start
+            print(
+                f"新增 {sum(counts.values())} 道题 ({elapsed:.1f}s)："
+                f"新题 {counts['new']}，完全重复 {counts['exact']}，近似重复 {counts['near']}"
+            )
+        index.save(config.index)
+        print(f"💾 索引已保存: {config.index}")
+
+    clusters = index.duplicate_clusters()
+    total = sum(index.occurrences(key) for key in index.entries)
+    distinct = sum(1 for key in index.entries if index.occurrences(key))
+    removable = sum(
+        sum(index.occurrences(k) for k in members) - 1 for _, members in clusters
+    )
+    print(
+        f"\n题库共 {total} 道题，{distinct} 道不同题目，"
+        f"重复簇 {len(clusters)} 个 (去重后可少处理 {removable} 道)"
+    )
+    if clusters:
+        export_clusters(index, clusters, config.output)
+        print(f"✅ 重复簇已输出到: {os.path.abspath(config.output)}")
+
+
+if __name__ == "__main__":
+    main()
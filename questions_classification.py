@@ -7,15 +7,24 @@ DeepSeek 智能选题分类脚本 (增强通信类识别版)
 """
 
 import pandas as pd
-import requests
+import asyncio
 import os
 import re
 import time
 import argparse
+import codecs
 import glob
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import sqlite3
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 
+from llm_client import AsyncLLMClient, LLMError
+from local_classifier import SKLEARN_AVAILABLE, LocalClassifier
+from parquet_cache import PARQUET_AVAILABLE, CACHE_DIR as PARQUET_CACHE_DIR, read_cached
+
 # ================= 配置区域 =================
 
 # 1. API Key
@@ -24,19 +33,38 @@ API_KEY = ""
 # 2. 题目列名
 QUESTION_COLUMN = "题目名称"
 
-# 3. 线程数 (建议 10)
-MAX_WORKERS = 15
+# 3. 同时在途的 API 请求数 (异步并发，不再受线程数限制)
+MAX_CONCURRENCY = 100
 
 # 4. 最大重试次数
 MAX_RETRIES = 5
 
+# 4.0 DeepSeek 限流 (按账号额度调整)：每分钟请求数 / 每分钟 Token 数 (None 为不限)
+RATE_LIMIT_RPM = 600
+RATE_LIMIT_TPM = None
+
+# 4.1 批量分类：每个请求打包的题目数 (1 表示逐题请求)
+BATCH_SIZE = 20
+
 # 5. 输出文件夹
 OUTPUT_DIR = "南网_分类结果_按详细知识点拆分"
 OUTPUT_MASTER_FILE = "题库_总表(含分类结果).xlsx"
+# 每完成一题立即追加到日志，崩溃后重启时回放；总表只在全部完成后写一次
+JOURNAL_FILE = "题库_分类日志.jsonl"
+
+# 6. 分类缓存 (SQLite，按 归一化题目文本 + Prompt/模型 哈希寻址，跨次运行复用)
+CACHE_FILE = "题库_分类缓存.sqlite"
+CACHE_MAX_ENTRIES = 200000  # 超出后按最近使用时间淘汰
+CACHE_MAX_AGE_DAYS = 180  # 超过该天数的缓存条目直接失效
+
+# 7. 本地预分类 (local_classifier.py)：关键词/本地模型置信度不低于该值的题目不再请求 API
+LOCAL_THRESHOLD = 0.75
 
 # ===========================================
 
 API_URL = "https://api.deepseek.com/chat/completions"
+MODEL_NAME = "deepseek-chat"
+SYSTEM_PROMPT = "你是一个严谨的考试题目分类专家。请仔细区分通信工程与计算机科学的边界。"
 
 # === 核心修改：增强型 Prompt ===
 CATEGORIES_PROMPT = """
@@ -152,6 +180,15 @@ Step 3: 仅返回“编号+类别名称”（例如：“5 调制解调技术”
 47 大数据基础
 """
 
+# 批量模式追加在 CATEGORIES_PROMPT 之后的说明 ({count} 为本批题目数)
+BATCH_INSTRUCTION = (
+    "\n!!! 本次共有 {count} 道题目，请逐题独立分类 !!!\n"
+    "Step 3 改为：只返回一个 JSON 对象，键为题目序号（字符串），"
+    "值为“编号+类别名称”，"
+    '例如 {{"1": "5 调制解调技术", "2": "2 线性表"}}。'
+    "必须覆盖全部序号，不要输出任何解释或其他内容。\n"
+)
+
 parser = argparse.ArgumentParser(description="混合题库智能分类脚本")
 parser.add_argument(
     "-i",
@@ -160,7 +197,243 @@ parser.add_argument(
     default=r"E:\my_script\专业知识 南方电网通信计算机类题库",
     help="输入的文件路径 或 文件夹路径",
 )
-config = parser.parse_args()
+parser.add_argument(
+    "--concurrency",
+    type=int,
+    default=MAX_CONCURRENCY,
+    help="同时在途的 API 请求数上限",
+)
+parser.add_argument(
+    "--rpm", type=int, default=RATE_LIMIT_RPM, help="DeepSeek 每分钟请求数上限"
+)
+parser.add_argument(
+    "--tpm", type=int, default=RATE_LIMIT_TPM, help="DeepSeek 每分钟 Token 数上限"
+)
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    default=BATCH_SIZE,
+    help="每个请求打包的题目数，1 表示逐题请求",
+)
+parser.add_argument(
+    "--cache", type=str, default=CACHE_FILE, help="分类缓存文件路径 (SQLite)"
+)
+parser.add_argument(
+    "--no-cache", action="store_true", help="禁用持久化缓存 (仅在本次运行内去重)"
+)
+parser.add_argument(
+    "--cache-max-entries",
+    type=int,
+    default=CACHE_MAX_ENTRIES,
+    help="缓存最大条目数，超出后淘汰最久未使用的条目",
+)
+parser.add_argument(
+    "--cache-max-age-days",
+    type=float,
+    default=CACHE_MAX_AGE_DAYS,
+    help="缓存条目最长保留天数",
+)
+parser.add_argument(
+    "--local-threshold",
+    type=float,
+    default=LOCAL_THRESHOLD,
+    help="本地预分类 (关键词 + TF-IDF 模型) 的置信度阈值，越高越保守",
+)
+parser.add_argument(
+    "--no-local", action="store_true", help="禁用本地预分类，全部题目交给 API"
+)
+parser.add_argument(
+    "--no-parquet-cache",
+    action="store_true",
+    help="不使用 Parquet 缓存，每次都重新解析题库文件",
+)
+parser.add_argument(
+    "--load-workers",
+    type=int,
+    default=None,
+    help="并行读取题库文件的进程数 (默认 CPU 核数)",
+)
+
+
+def normalize_question(text):
+    """归一化题目文本：全角转半角、去除所有空白、统一小写，用于缓存寻址"""
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return ""
+    text = unicodedata.normalize("NFKC", str(text))
+    return re.sub(r"\s+", "", text).lower()
+
+
+def prompt_fingerprint():
+    """Prompt (含批量模式说明) 或模型一旦修改，旧缓存自动失效"""
+    raw = "\n".join([MODEL_NAME, SYSTEM_PROMPT, CATEGORIES_PROMPT, BATCH_INSTRUCTION])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    基于 SQLite 的内容寻址分类缓存。
+    key = sha256(Prompt指纹 + 归一化题目)，只缓存成功的分类结果。
+    path 为 ":memory:" 时退化为仅本次运行内有效的去重表。
+    """
+
+    def __init__(
+        self, path, max_entries=CACHE_MAX_ENTRIES, max_age_days=CACHE_MAX_AGE_DAYS
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.fingerprint = prompt_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._pending = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                   key TEXT PRIMARY KEY,
+                   result TEXT NOT NULL,
+                   created REAL NOT NULL,
+                   last_used REAL NOT NULL
+               )""")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_used ON cache(last_used)"
+        )
+        self._evict_expired()
+
+    def make_key(self, question_text):
+        normalized = normalize_question(question_text)
+        if not normalized:
+            return ""
+        raw = f"{self.fingerprint}\n{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT result FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute(
+            "UPDATE cache SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        return row[0]
+
+    def put(self, key, result):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache (key, result, created, last_used) VALUES (?, ?, ?, ?)",
+            (key, result, now, now),
+        )
+        self._pending += 1
+        if self._pending >= 50:
+            self.conn.commit()
+            self._pending = 0
+
+    def _evict_expired(self):
+        if self.max_age_days and self.max_age_days > 0:
+            deadline = time.time() - self.max_age_days * 86400
+            cur = self.conn.execute("DELETE FROM cache WHERE created < ?", (deadline,))
+            self.evicted += cur.rowcount
+            self.conn.commit()
+
+    def _evict_overflow(self):
+        if not self.max_entries or self.max_entries <= 0:
+            return
+        total = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        overflow = total - self.max_entries
+        if overflow > 0:
+            cur = self.conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evicted += cur.rowcount
+
+    def size(self):
+        return self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self._evict_overflow()
+            self.conn.commit()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # 无论分类过程是否异常，都要提交已写入的条目并执行淘汰
+        self.close()
+
+
+def question_hash(question_text):
+    """题目内容的稳定哈希 (与 Prompt 无关)，用于日志回放时定位行"""
+    return hashlib.sha1(normalize_question(question_text).encode("utf-8")).hexdigest()
+
+
+class ClassificationJournal:
+    """
+    追加写入的分类日志 (JSONL)。
+    每条记录 {"src": 来源文件, "q": 题目哈希, "result": 分类}，写入后立即 flush，
+    进程崩溃最多丢失正在写的那一行；重启时按 (来源文件, 题目哈希) 回放。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._seen = set()
+        self._fp = None
+
+    def replay(self):
+        """读取已有日志，返回 {(来源文件, 题目哈希): 分类}；末尾写了一半的行会被忽略"""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                    entries[(item["src"], item["q"])] = item["result"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+        self._seen.update(entries)
+        return entries
+
+    def record(self, src, qhash, result):
+        if (src, qhash) in self._seen:
+            return
+        if self._fp is None:
+            self._fp = open(self.path, "a", encoding="utf-8")
+        self._fp.write(
+            json.dumps({"src": src, "q": qhash, "result": result}, ensure_ascii=False)
+            + "\n"
+        )
+        self._fp.flush()
+        self._seen.add((src, qhash))
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def discard(self):
+        """总表落盘成功后日志已无用，删除以免无限增长"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def source_of(df, idx):
+    if "来源文件" in df.columns:
+        return str(df.at[idx, "来源文件"])
+    return ""
 
 
 def get_all_excel_files(path):
@@ -177,80 +450,245 @@ def get_all_excel_files(path):
     return [f for f in file_list if not os.path.basename(f).startswith("~$")]
 
 
-def call_deepseek_api(question_text, index_info=""):
+def clean_category(content):
+    """清洗模型返回的分类文本中可能出现的前缀"""
+    return str(content).replace("【A】", "").replace("【B】", "").strip()
+
+
+async def post_chat(client, messages, max_tokens, extra=None):
+    """
+    向 DeepSeek 发送一次对话请求（含重试）。
+    返回 (content, last_error)，成功时 last_error 为空串。
+    """
+    data = {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+    }
+    if extra:
+        data.update(extra)
+
+    try:
+        content = await client.chat(
+            "deepseek",
+            API_URL,
+            API_KEY,
+            data,
+            retries=MAX_RETRIES,
+            timeout=30,
+            backoff=1.5,
+        )
+        return content.strip(), ""
+    except LLMError as e:
+        return None, str(e)
+
+
+async def call_deepseek_api(client, question_text, index_info=""):
     if not question_text or str(question_text).strip() == "":
         return "未分类"
 
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {API_KEY}"}
-
     messages = [
-        {
-            "role": "system",
-            "content": "你是一个严谨的考试题目分类专家。请仔细区分通信工程与计算机科学的边界。",
-        },
+        {"role": "system", "content": SYSTEM_PROMPT},
         {
             "role": "user",
             "content": f"{CATEGORIES_PROMPT}\n\n题目内容：{question_text}\n\n所属分类（仅输出编号和名称）：",
         },
     ]
 
-    data = {
-        "model": "deepseek-chat",
-        "messages": messages,
-        "temperature": 0.1,
-        "max_tokens": 60,
-    }
-
-    last_error = ""
-    for attempt in range(1, MAX_RETRIES + 1):
+    content, last_error = await post_chat(client, messages, max_tokens=60)
+    if content is None:
+        return f"分类失败 [{last_error}]"
+    return clean_category(content)
+
+
+def build_batch_prompt(questions):
+    """把多道题目打包成一个带序号的请求，要求模型以 JSON 返回"""
+    lines = [CATEGORIES_PROMPT, BATCH_INSTRUCTION.format(count=len(questions))]
+    for i, question in enumerate(questions, 1):
+        text = re.sub(r"\s+", " ", str(question)).strip()
+        lines.append(f"【题目{i}】{text}")
+    lines.append("\n请输出 JSON：")
+    return "\n".join(lines)
+
+
+def parse_batch_response(content, count):
+    """
+    解析批量分类返回的 JSON，返回 {序号(从1开始): 分类}。
+    缺失、越界或格式不符（不以编号开头）的条目会被丢弃，交由单题请求兜底。
+    """
+    if not content:
+        return {}
+    text = content.strip()
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    left, right = text.find("{"), text.rfind("}")
+    if left == -1 or right <= left:
+        return {}
+    try:
+        data = json.loads(text[left : right + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    results = {}
+    for k, v in data.items():
         try:
-            response = requests.post(API_URL, headers=headers, json=data, timeout=30)
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"].strip()
-                content = (
-                    content.replace("【A】", "").replace("【B】", "").strip()
-                )  # 清洗可能出现的前缀
-                return content
-            elif response.status_code == 429:
-                time.sleep(2**attempt)
-                continue
-            else:
-                last_error = f"HTTP {response.status_code}"
-        except Exception as e:
-            last_error = f"网络异常: {str(e)}"
-
-        if attempt < MAX_RETRIES:
-            time.sleep(1.5 * attempt)
-
-    return f"分类失败 [{last_error}]"
-
-
-def process_single_task(index, question):
-    return index, call_deepseek_api(question, index_info=index)
-
-
-def load_and_merge_data(file_list):
-    all_dfs = []
-    print(f"找到 {len(file_list)} 个文件，开始读取...")
-    for f in file_list:
+            num = int(str(k).strip().strip("【】题目"))
+        except ValueError:
+            continue
+        if not 1 <= num <= count or not isinstance(v, str):
+            continue
+        category = clean_category(v)
+        if re.match(r"^\d+\s*\S", category):
+            results[num] = category
+    return results
+
+
+async def call_deepseek_batch(client, questions):
+    """
+    批量分类，返回 (results, last_error)。
+    results 与 questions 等长，未能解析的位置为 None；
+    整个请求失败 (网络/HTTP 错误重试耗尽) 时 results 为 None。
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_batch_prompt(questions)},
+    ]
+    content, last_error = await post_chat(
+        client,
+        messages,
+        max_tokens=40 * len(questions) + 50,
+        extra={"response_format": {"type": "json_object"}},
+    )
+    if content is None:
+        return None, last_error
+    parsed = parse_batch_response(content, len(questions))
+    return [parsed.get(i) for i in range(1, len(questions) + 1)], ""
+
+
+async def process_single_task(client, key, question):
+    return key, await call_deepseek_api(client, question, index_info=key)
+
+
+async def process_batch_task(client, keys, questions):
+    """
+    批量任务：先整批请求，模型漏答或格式错误的题目自动回退为单题请求。
+    整批请求本身失败时（服务商故障）直接整批标记失败，不再逐题放大请求量，
+    下次运行会作为"失败"项自动重跑。
+    返回 ([(key, 分类), ...], 回退次数)
+    """
+    results, last_error = await call_deepseek_batch(client, questions)
+    if results is None:
+        return [(key, f"分类失败 [{last_error}]") for key in keys], 0
+
+    pairs = []
+    fallback = 0
+    for key, question, result in zip(keys, questions, results):
+        if result is None:
+            fallback += 1
+            result = await call_deepseek_api(client, question, index_info=key)
+        pairs.append((key, result))
+    return pairs, fallback
+
+
+def detect_encoding(path, sample_size=64 * 1024):
+    """只读文件开头一段字节判断编码 (utf-8 或 gbk)，不必整份解析失败后再重来"""
+    with open(path, "rb") as fp:
+        sample = fp.read(sample_size)
+    try:
+        # 增量解码：样本末尾被截断的多字节字符不算错误
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gbk"
+
+
+def read_question_file(f, usecols=None):
+    if f.endswith(".csv"):
+        encoding = detect_encoding(f)
         try:
-            if f.endswith(".csv"):
-                try:
-                    df = pd.read_csv(f, encoding="utf-8")
-                except:
-                    df = pd.read_csv(f, encoding="gbk")
-            else:
-                df = pd.read_excel(f)
-
-            df["来源文件"] = os.path.basename(f)
-            if QUESTION_COLUMN in df.columns:
-                all_dfs.append(df)
-            else:
-                print(
-                    f"⚠️ 跳过文件 (未找到'{QUESTION_COLUMN}'列): {os.path.basename(f)}"
-                )
-        except Exception as e:
-            print(f"❌ 读取失败 {os.path.basename(f)}: {e}")
+            return pd.read_csv(f, encoding=encoding, usecols=usecols)
+        except UnicodeDecodeError:
+            # 样本之后才出现非 utf-8 字节的少见情况
+            return pd.read_csv(f, encoding="gbk", usecols=usecols)
+    return pd.read_excel(f, usecols=usecols)
+
+
+def load_question_file(
+    f, cache_dir=PARQUET_CACHE_DIR, columns=None, source=os.path.basename
+):
+    """
+    读取单个题库文件 (进程池任务)。source(f) 的结果写入 来源文件 列。
+    返回 (文件路径, DataFrame 或 None, 耗时, 是否命中缓存, 错误信息)
+    """
+    start = time.perf_counter()
+    try:
+        df, hit = read_cached(f, read_question_file, columns, cache_dir)
+    except Exception as e:
+        return f, None, time.perf_counter() - start, False, str(e)
+    df["来源文件"] = source(f)
+    return f, df, time.perf_counter() - start, hit, ""
+
+
+def load_and_merge_data(
+    file_list,
+    cache_dir=PARQUET_CACHE_DIR,
+    columns=None,
+    jobs=None,
+    source=os.path.basename,
+):
+    """
+    读取并合并题库文件：多个文件时用进程池并行解析 (xlsx 解析是 CPU 密集型)，
+    全部读完后只 concat 一次，并输出每个文件的读取耗时。
+    cache_dir: Parquet 缓存目录，None 时不缓存
+    columns: 只读取的列 (列名列表或判断函数)，None 为全部列；需包含题目列
+    jobs: 进程数，默认 CPU 核数
+    source: 由文件路径生成 来源文件 列的函数，默认取文件名；需为模块级函数 (可传给进程池)
+    """
+    print(f"找到 {len(file_list)} 个文件，开始读取...")
+    if cache_dir is not None and not PARQUET_AVAILABLE:
+        # 在主进程提示一次，子进程不再各自提示
+        print("⚠️ 未安装 pyarrow，Parquet 缓存不可用，直接读取源文件")
+        cache_dir = None
+    jobs = min(jobs or os.cpu_count() or 1, len(file_list))
+    start = time.perf_counter()
+    results = []
+    if jobs <= 1:
+        for f in file_list:
+            results.append(load_question_file(f, cache_dir, columns, source))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(load_question_file, f, cache_dir, columns, source)
+                for f in file_list
+            ]
+            with tqdm(total=len(futures), unit="文件", ncols=100) as pbar:
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    pbar.update(1)
+
+    # 按输入顺序合并，结果与逐个读取时一致
+    order = {f: i for i, f in enumerate(file_list)}
+    results.sort(key=lambda item: order[item[0]])
+    all_dfs = []
+    cache_hits = 0
+    print("\n📊 文件读取报告：")
+    for f, df, seconds, hit, error in results:
+        name = os.path.basename(f)
+        if error:
+            print(f"    ❌ 读取失败 {name}: {error}")
+        elif QUESTION_COLUMN not in df.columns:
+            print(f"    ⚠️ 跳过文件 (未找到'{QUESTION_COLUMN}'列): {name}")
+        else:
+            all_dfs.append(df)
+            cache_hits += hit
+            source = " (Parquet 缓存)" if hit else ""
+            print(f"    ✅ {name}: {len(df)} 行, {seconds:.2f}s{source}")
+    print(
+        f"读取完成: {len(all_dfs)}/{len(file_list)} 个文件, 进程数 {jobs}, "
+        f"缓存命中 {cache_hits}, 总耗时 {time.perf_counter() - start:.1f}s"
+    )
 
     if not all_dfs:
         return pd.DataFrame()
@@ -290,7 +728,112 @@ def split_excel_by_category(df):
     print(f"拆分完成！共 {count} 个分类文件。")
 
 
+async def classify_pending(
+    df, pending_keys, key_to_indices, cache, journal, batch_size, config
+):
+    """
+    异步并发分类所有缓存未命中的题目，结果写回 df、写入缓存，并逐条追加到日志。
+    返回批量模式下回退为单题请求的题目数。
+    """
+    fallback_count = 0
+    async with AsyncLLMClient(
+        concurrency={"deepseek": config.concurrency},
+        rate_limits={"deepseek": (config.rpm, config.tpm)},
+    ) as client:
+        tasks = []
+        for start in range(0, len(pending_keys), batch_size):
+            keys = pending_keys[start : start + batch_size]
+            questions = [
+                df.loc[key_to_indices[key][0], QUESTION_COLUMN] for key in keys
+            ]
+            if batch_size == 1:
+                tasks.append(process_single_task(client, keys[0], questions[0]))
+            else:
+                tasks.append(process_batch_task(client, keys, questions))
+
+        pbar = tqdm(total=len(pending_keys), unit="题", ncols=100)
+        counter = 0
+        for coro in asyncio.as_completed(tasks):
+            if batch_size == 1:
+                pairs = [await coro]
+            else:
+                pairs, fallback = await coro
+                fallback_count += fallback
+
+            for key, result in pairs:
+                indices = key_to_indices[key]
+                for idx in indices:
+                    df.at[idx, "知识点分类"] = result
+                counter += 1
+                if "失败" not in result:
+                    qhash = question_hash(df.at[indices[0], QUESTION_COLUMN])
+                    for idx in indices:
+                        journal.record(source_of(df, idx), qhash, result)
+
+                # 打印前几条结果，方便用户Debug
+                if counter <= 5:
+                    tqdm.write(
+                        f"Debug: 题目片段 '{str(df.loc[indices[0], QUESTION_COLUMN])[:10]}...' -> 分类: {result}"
+                    )
+
+                if "失败" in result:
+                    pbar.set_postfix_str(
+                        f"ID:{indices[0]} 失败 | {client.rate_status()}"
+                    )
+                else:
+                    cache.put(key, result)
+                    if counter % 10 == 0:
+                        pbar.set_postfix_str(client.rate_status())
+            pbar.update(len(pairs))
+        pbar.close()
+    return fallback_count
+
+
+def classify_locally(
+    df, pending_keys, key_to_indices, journal, batch_size, threshold, trained
+):
+    """
+    本地预分类：关键词规则 + (可选) 用总表中已分类题目训练的 TF-IDF 模型。
+    有把握的题目直接写回 df 并记入日志 (不写入 API 结果缓存)，返回仍需请求 API 的 key。
+    """
+    classifier = LocalClassifier(threshold)
+    labels = df.loc[trained, "知识点分类"].astype(str)
+    labels = labels[~labels.str.contains("失败|错误|未分类")]
+    if classifier.train(df.loc[labels.index, QUESTION_COLUMN].astype(str), labels):
+        print(f"本地模型已用 {len(labels)} 道已分类题目训练")
+    elif not SKLEARN_AVAILABLE:
+        print("未安装 scikit-learn，本地预分类仅使用关键词规则")
+
+    questions = [
+        str(df.at[key_to_indices[key][0], QUESTION_COLUMN]) for key in pending_keys
+    ]
+    results = classifier.classify_many(questions)
+
+    remaining = []
+    for key, result in zip(pending_keys, results):
+        if result is None:
+            remaining.append(key)
+            continue
+        indices = key_to_indices[key]
+        qhash = question_hash(df.at[indices[0], QUESTION_COLUMN])
+        for idx in indices:
+            df.at[idx, "知识点分类"] = result
+            journal.record(source_of(df, idx), qhash, result)
+
+    local_count = len(pending_keys) - len(remaining)
+    requests_saved = -(-len(pending_keys) // batch_size) - (
+        -(-len(remaining) // batch_size)
+    )
+    print(
+        f"本地预分类 {local_count} 题 (关键词 {classifier.stats['keyword']}，"
+        f"模型 {classifier.stats['model']})，节省 API 请求 {requests_saved} 次"
+    )
+    return remaining
+
+
 def main():
+    # 命令行只在作为脚本运行时解析，其它脚本 (如 question_dedup.py) 可以直接导入本模块的读取函数
+    config = parser.parse_args()
     input_path = config.input
     files = get_all_excel_files(input_path)
     if not files:
@@ -301,7 +844,11 @@ def main():
         print(f"读取中间文件 '{OUTPUT_MASTER_FILE}' 继续处理...")
         df = pd.read_excel(OUTPUT_MASTER_FILE)
     else:
-        df = load_and_merge_data(files)
+        df = load_and_merge_data(
+            files,
+            cache_dir=None if config.no_parquet_cache else PARQUET_CACHE_DIR,
+            jobs=config.load_workers,
+        )
 
     if df.empty:
         return
@@ -310,48 +857,109 @@ def main():
         df["知识点分类"] = ""
 
     # 强制重跑失败或未分类的项
-    unprocessed_mask = (
-        (df["知识点分类"].isna())
-        | (df["知识点分类"] == "")
-        | (df["知识点分类"].astype(str).str.contains("失败|错误"))
-    )
+    def unprocessed():
+        return (
+            (df["知识点分类"].isna())
+            | (df["知识点分类"] == "")
+            | (df["知识点分类"].astype(str).str.contains("失败|错误"))
+        )
+
+    # 回放上次中断留下的日志
+    journal = ClassificationJournal(JOURNAL_FILE)
+    journal_entries = journal.replay()
+    if journal_entries:
+        replayed = 0
+        for idx in df[unprocessed()].index:
+            qhash = question_hash(df.at[idx, QUESTION_COLUMN])
+            result = journal_entries.get((source_of(df, idx), qhash))
+            if result is not None:
+                df.at[idx, "知识点分类"] = result
+                replayed += 1
+        print(f"从日志 '{JOURNAL_FILE}' 恢复 {replayed} 条分类结果")
+
+    unprocessed_mask = unprocessed()
 
     unprocessed_indices = df[unprocessed_mask].index.tolist()
     total_tasks = len(unprocessed_indices)
     print(f"待处理: {total_tasks} 条")
 
     if total_tasks > 0:
-        print(f"开始并发分类 (线程:{MAX_WORKERS})...")
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            future_to_idx = {
-                executor.submit(
-                    process_single_task, idx, df.loc[idx, QUESTION_COLUMN]
-                ): idx
-                for idx in unprocessed_indices
-            }
-
-            pbar = tqdm(
-                as_completed(future_to_idx), total=total_tasks, unit="题", ncols=100
+        with ClassificationCache(
+            ":memory:" if config.no_cache else config.cache,
+            max_entries=config.cache_max_entries,
+            max_age_days=config.cache_max_age_days,
+        ) as cache:
+
+            # 按归一化题目文本分组：相同题目只查一次缓存、只请求一次 API
+            key_to_indices = {}
+            for idx in unprocessed_indices:
+                key = cache.make_key(df.loc[idx, QUESTION_COLUMN])
+                if not key:
+                    df.at[idx, "知识点分类"] = "未分类"
+                    continue
+                key_to_indices.setdefault(key, []).append(idx)
+
+            pending_keys = []
+            for key, indices in key_to_indices.items():
+                cached = cache.get(key)
+                if cached is None:
+                    pending_keys.append(key)
+                    continue
+                for idx in indices:
+                    df.at[idx, "知识点分类"] = cached
+
+            batch_size = max(1, config.batch_size)
+            if pending_keys and not config.no_local:
+                pending_keys = classify_locally(
+                    df,
+                    pending_keys,
+                    key_to_indices,
+                    journal,
+                    batch_size,
+                    config.local_threshold,
+                    trained=~unprocessed_mask,
+                )
+
+            print(
+                f"去重后 {len(key_to_indices)} 道不同题目，缓存命中 {cache.hits}，"
+                f"需请求 API {len(pending_keys)} 题"
             )
-            counter = 0
-            for future in pbar:
-                idx, result = future.result()
-                df.at[idx, "知识点分类"] = result
-                counter += 1
 
-                # 打印前几条结果，方便用户Debug
-                if counter <= 5:
-                    tqdm.write(
-                        f"Debug: 题目片段 '{str(df.loc[idx, QUESTION_COLUMN])[:10]}...' -> 分类: {result}"
+            if pending_keys:
+                print(
+                    f"开始异步并发分类 (在途请求上限:{config.concurrency}, 每批:{batch_size} 题)..."
+                )
+                try:
+                    fallback_count = asyncio.run(
+                        classify_pending(
+                            df,
+                            pending_keys,
+                            key_to_indices,
+                            cache,
+                            journal,
+                            batch_size,
+                            config,
+                        )
                     )
+                finally:
+                    journal.close()
+                if batch_size > 1:
+                    print(f"批量请求中漏答/格式错误回退为单题请求: {fallback_count} 题")
 
-                if "失败" in result:
-                    pbar.set_postfix_str(f"ID:{idx} 失败")
-                if counter % 50 == 0:
-                    df.to_excel(OUTPUT_MASTER_FILE, index=False)
-
+        # 总表只在最后写一次，成功后日志即可丢弃
         df.to_excel(OUTPUT_MASTER_FILE, index=False)
+        journal.discard()
         print("\n分类完成。")
+        print(
+            f"缓存统计: 命中 {cache.hits} / 未命中 {cache.misses}，"
+            f"重复题目合并节省 {total_tasks - len(key_to_indices)} 次请求，"
+            f"淘汰 {cache.evicted} 条"
+        )
+
+    elif journal_entries:
+        # 日志已覆盖全部剩余题目：只需把回放结果落盘
+        df.to_excel(OUTPUT_MASTER_FILE, index=False)
+        journal.discard()
 
     split_excel_by_category(df)
     print(f"\n全部完成！结果在: {os.path.abspath(OUTPUT_DIR)}")
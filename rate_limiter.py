@@ -0,0 +1,138 @@
+"""
+按服务商共享的自适应限流器 (令牌桶 + AIMD)
+
+- 每个服务商一个实例，所有协程共享：请求数/分钟 (RPM) 与 Token 数/分钟 (TPM) 两个令牌桶
+- 收到 429 时乘性降速 (默认减半) 并按 Retry-After 暂停整个服务商，而不是每个请求各自 sleep
+- 请求成功时加性恢复速率，直到配置的上限
+- rate / queue_depth / status() 可用于日志输出
+"""
+
+import asyncio
+import time
+
+# 未单独配置时的默认限额
+DEFAULT_RPM = 600
+DEFAULT_TPM = None  # None 表示不限制 Token 速率
+
+# 令牌桶容量 = 几秒的配额，决定允许的瞬时突发量
+BURST_SECONDS = 5
+
+# AIMD 参数
+DECREASE_FACTOR = 0.5  # 每次 429 速率乘以该系数
+INCREASE_STEP = 0.01  # 每次成功速率系数加上该值 (相对上限)
+MIN_FACTOR = 0.05  # 速率不低于上限的 5%
+THROTTLE_COOLDOWN = 2.0  # 该时间窗内的多次 429 只降速一次，避免并发请求把速率连续砍到底
+
+
+class TokenBucket:
+    """连续补充的令牌桶，rate_per_min 可随时调整"""
+
+    def __init__(self, rate_per_min):
+        self.rate_per_min = rate_per_min
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def capacity(self):
+        return max(1.0, self.rate_per_min / 60 * BURST_SECONDS)
+
+    def refill(self, now):
+        # updated 可能被设置在未来 (暂停期间不补充令牌)
+        elapsed = max(0.0, now - self.updated)
+        self.updated = max(self.updated, now)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_min / 60)
+
+    def wait_time(self, amount):
+        """距离攒够 amount 个令牌还需要的秒数 (超过容量的请求按容量计)"""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / (self.rate_per_min / 60)
+
+
+class AdaptiveRateLimiter:
+    """单个服务商的自适应限流器"""
+
+    def __init__(self, name, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+        self.name = name
+        self.max_rpm = rpm
+        self.max_tpm = tpm
+        self.factor = 1.0
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self.last_throttle = 0.0
+        self.throttle_count = 0
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self):
+        """当前允许的请求数/分钟"""
+        return self.max_rpm * self.factor
+
+    @property
+    def queue_depth(self):
+        """正在排队等待配额的请求数"""
+        return self.waiting
+
+    def status(self):
+        text = f"{self.name}: {self.rate:.0f}/min 排队{self.waiting}"
+        if self.throttle_count:
+            text += f" 429×{self.throttle_count}"
+        return text
+
+    def _apply_factor(self):
+        self.requests.rate_per_min = self.max_rpm * self.factor
+        if self.tokens is not None:
+            self.tokens.rate_per_min = self.max_tpm * self.factor
+
+    async def acquire(self, token_estimate=0):
+        """等待直到可以发出一个预计消耗 token_estimate 个 Token 的请求 (先到先得)"""
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if self.paused_until > now:
+                        await asyncio.sleep(self.paused_until - now)
+                        continue
+
+                    self.requests.refill(now)
+                    wait = self.requests.wait_time(1)
+                    if self.tokens is not None:
+                        self.tokens.refill(now)
+                        wait = max(wait, self.tokens.wait_time(token_estimate))
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+
+                self.requests.tokens -= 1
+                if self.tokens is not None:
+                    self.tokens.tokens -= min(token_estimate, self.tokens.capacity)
+        finally:
+            self.waiting -= 1
+
+    def on_success(self, token_estimate=0, tokens_used=None):
+        """请求成功：加性提速，并用实际 Token 用量校正预估值"""
+        if self.factor < 1.0:
+            self.factor = min(1.0, self.factor + INCREASE_STEP)
+            self._apply_factor()
+        if self.tokens is not None and tokens_used is not None:
+            self.tokens.tokens -= tokens_used - min(
+                token_estimate, self.tokens.capacity
+            )
+
+    def on_throttle(self, retry_after=None, default_pause=1.0):
+        """收到 429：乘性降速，并暂停整个服务商 retry_after 秒"""
+        now = time.monotonic()
+        self.throttle_count += 1
+        if now - self.last_throttle >= THROTTLE_COOLDOWN:
+            self.factor = max(MIN_FACTOR, self.factor * DECREASE_FACTOR)
+            self._apply_factor()
+            self.last_throttle = now
+            # 清空已积攒的突发额度，恢复后按新速率平滑发送
+            self.requests.tokens = min(self.requests.tokens, 0.0)
+        pause = retry_after if retry_after is not None else default_pause
+        self.paused_until = max(self.paused_until, now + pause)
+        self.requests.updated = max(self.requests.updated, self.paused_until)
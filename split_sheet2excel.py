@@ -1,6 +1,16 @@
 import openpyxl
 import os
 import argparse
+import html
+import posixpath
+import re
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import copy
+from openpyxl.worksheet.datavalidation import DataValidation
+from tqdm import tqdm
 
 # 设置命令行参数
 parser = argparse.ArgumentParser(description="批量将文件夹下的Excel文件按Sheet拆分")
@@ -11,52 +21,481 @@ parser.add_argument(
     default="E:\my_script\题目分类2（南网）",
     help="指定要处理的文件夹路径 (默认为当前目录)",
 )
-config = parser.parse_args()
+parser.add_argument(
+    "--engine",
+    choices=["copy", "reload", "zip"],
+    default="copy",
+    help="copy: 只解析一次工作簿，逐个 Sheet 复制到新文件 (默认)；"
+    "reload: 每个 Sheet 重新加载整个工作簿再删除其它 Sheet (保留图片/图表等全部内容，但慢)；"
+    "zip: 不解析单元格，直接在 zip 包层面复制 Sheet 的 XML (最快、内存占用最小，单元格内容原样保留)",
+)
+parser.add_argument(
+    "-j",
+    "--jobs",
+    type=int,
+    default=1,
+    help="并行进程数 (默认1，即逐个文件串行处理)",
+)
+
+# 超过该大小且包含多个 Sheet 的工作簿，在 --jobs 模式下按 Sheet 分组交给多个进程
+LARGE_FILE_BYTES = 20 * 1024 * 1024
+
+
+# 需要逐项复制的页面设置属性 (page_setup 对象绑定在所属工作表上，不能整体替换)
+PAGE_SETUP_ATTRS = [
+    "orientation",
+    "paperSize",
+    "scale",
+    "fitToHeight",
+    "fitToWidth",
+    "firstPageNumber",
+    "useFirstPageNumber",
+    "paperHeight",
+    "paperWidth",
+    "pageOrder",
+    "usePrinterDefaults",
+    "blackAndWhite",
+    "draft",
+    "cellComments",
+    "errors",
+    "horizontalDpi",
+    "verticalDpi",
+    "copies",
+]
+
+
+def copy_sheet(source, target):
+    """
+    把 source 工作表的内容与格式复制到另一个工作簿的 target 工作表：
+    单元格值与样式、合并单元格、列宽/行高、数据验证、条件格式、
+    打印设置 (页面设置/页边距/页眉页脚/打印标题/打印区域)、冻结窗格
+    """
+    for row in source.iter_rows():
+        for cell in row:
+            if cell.__class__.__name__ == "MergedCell":
+                continue
+            new_cell = target.cell(row=cell.row, column=cell.column, value=cell.value)
+            if cell.has_style:
+                new_cell.font = copy(cell.font)
+                new_cell.border = copy(cell.border)
+                new_cell.fill = copy(cell.fill)
+                new_cell.number_format = cell.number_format
+                new_cell.protection = copy(cell.protection)
+                new_cell.alignment = copy(cell.alignment)
+            if cell.hyperlink:
+                new_cell.hyperlink = copy(cell.hyperlink)
+            if cell.comment:
+                new_cell.comment = copy(cell.comment)
+
+    for merged_range in source.merged_cells.ranges:
+        target.merge_cells(str(merged_range))
+
+    for key, dim in source.column_dimensions.items():
+        new_dim = target.column_dimensions[key]
+        new_dim.width = dim.width
+        new_dim.hidden = dim.hidden
+        new_dim.min = dim.min
+        new_dim.max = dim.max
+    for idx, dim in source.row_dimensions.items():
+        new_dim = target.row_dimensions[idx]
+        new_dim.height = dim.height
+        new_dim.hidden = dim.hidden
+    target.sheet_format = copy(source.sheet_format)
+
+    for dv in source.data_validations.dataValidation:
+        new_dv = DataValidation(
+            type=dv.type,
+            formula1=dv.formula1,
+            formula2=dv.formula2,
+            allow_blank=dv.allow_blank,
+            showErrorMessage=dv.showErrorMessage,
+            showInputMessage=dv.showInputMessage,
+            errorTitle=dv.errorTitle,
+            error=dv.error,
+            promptTitle=dv.promptTitle,
+            prompt=dv.prompt,
+            operator=dv.operator,
+            errorStyle=dv.errorStyle,
+        )
+        new_dv.sqref = dv.sqref
+        target.add_data_validation(new_dv)
+
+    # 条件格式 (规则引用的差异样式 dxf 会在保存时登记到新工作簿)
+    for cf in source.conditional_formatting:
+        for rule in cf.rules:
+            target.conditional_formatting.add(str(cf.sqref), copy(rule))
+
+    # 打印设置：页面设置、打印选项、页边距、页眉页脚、打印标题与打印区域
+    for attr in PAGE_SETUP_ATTRS:
+        setattr(target.page_setup, attr, getattr(source.page_setup, attr))
+    target.sheet_properties.pageSetUpPr = copy(source.sheet_properties.pageSetUpPr)
+    target.print_options = copy(source.print_options)
+    target.page_margins = copy(source.page_margins)
+    target.HeaderFooter = copy(source.HeaderFooter)
+    if source.print_title_rows:
+        target.print_title_rows = source.print_title_rows
+    if source.print_title_cols:
+        target.print_title_cols = source.print_title_cols
+    if source.print_area:
+        target.print_area = source.print_area
+
+    target.freeze_panes = source.freeze_panes
+    target.sheet_properties.tabColor = copy(source.sheet_properties.tabColor)
+    if source.auto_filter.ref:
+        target.auto_filter.ref = source.auto_filter.ref
+
+
+def split_single_excel_copy(
+    file_path, output_root_folder, sheet_names=None, verbose=True
+):
+    """
+    单次解析版：工作簿只加载一次，每个 Sheet 复制到一个新的 Workbook 后保存
+    sheet_names: 只拆分这些 Sheet (默认全部)
+    返回生成的文件路径列表
+    """
+    file_basename = os.path.basename(file_path)
+    file_name_no_ext = os.path.splitext(file_basename)[0]
+    outputs = []
+
+    if verbose:
+        print(f"--> 正在读取文件：{file_basename}")
+
+    wb = openpyxl.load_workbook(file_path, data_only=False)
+    if verbose:
+        print(f"    检测到 {len(wb.sheetnames)} 个 Sheet: {wb.sheetnames}")
+
+    for source in wb.worksheets:
+        if sheet_names is not None and source.title not in sheet_names:
+            continue
+        new_wb = openpyxl.Workbook()
+        target = new_wb.active
+        target.title = source.title
+        copy_sheet(source, target)
+
+        new_filename = f"{file_name_no_ext}-{source.title}.xlsx"
+        output_path = os.path.join(output_root_folder, new_filename)
+        new_wb.save(output_path)
+        new_wb.close()
+        outputs.append(output_path)
+        if verbose:
+            print(f"    ✅ 已保存: {new_filename}")
+
+    wb.close()
+    return outputs
+
+
+def xml_attrs(tag):
+    """解析单个 XML 标签里的属性 (只用于 workbook.xml 等结构简单的部件)"""
+    return dict(re.findall(r'([\w:]+)="([^"]*)"', tag))
+
+
+def part_path(target, base="xl/"):
+    """关系文件中的 Target 转成 zip 内的路径"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(base + target)
+
+
+def rels_path(part):
+    """某个部件对应的 .rels 文件路径，如 xl/worksheets/_rels/sheet1.xml.rels"""
+    folder, name = posixpath.split(part)
+    return f"{folder}/_rels/{name}.rels"
+
+
+def build_single_sheet_parts(zin, keep_index):
+    """
+    生成只保留第 keep_index 个 Sheet 时需要改写的部件：
+    workbook.xml (sheets / activeTab / definedName)、workbook.xml.rels、[Content_Types].xml、_rels/.rels
+    返回 (改写后的部件 {路径: 内容}, 需要丢弃的部件集合)
+    """
+    workbook = zin.read("xl/workbook.xml").decode("utf-8")
+    workbook_rels = zin.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    content_types = zin.read("[Content_Types].xml").decode("utf-8")
+    root_rels = zin.read("_rels/.rels").decode("utf-8")
+
+    rel_targets = {}
+    rel_tags = re.findall(r"<Relationship\b[^>]*/>", workbook_rels)
+    for tag in rel_tags:
+        attrs = xml_attrs(tag)
+        rel_targets[attrs["Id"]] = (attrs["Type"], part_path(attrs["Target"]))
+
+    sheet_tags = re.findall(r"<sheet\b[^>]*/>", workbook)
+    sheet_names = [html.unescape(xml_attrs(tag)["name"]) for tag in sheet_tags]
+    keep_tag = sheet_tags[keep_index]
+    keep_rid = xml_attrs(keep_tag)["r:id"]
+
+    # 其它 Sheet 的部件及其 .rels、计算链、docProps/app.xml (其中的 Sheet 标题列表会过时) 都丢弃
+    dropped = set()
+    dropped_rids = set()
+    for tag in sheet_tags:
+        rid = xml_attrs(tag)["r:id"]
+        if rid != keep_rid:
+            part = rel_targets[rid][1]
+            dropped.update({part, rels_path(part)})
+            dropped_rids.add(rid)
+    for rid, (rel_type, part) in rel_targets.items():
+        if rel_type.endswith("/calcChain"):
+            dropped.add(part)
+            dropped_rids.add(rid)
+    dropped.add("docProps/app.xml")
 
+    # workbook.xml：只留一个 sheet，活动页签归零，按 Sheet 限定的名称只保留本 Sheet 的
+    workbook = re.sub(
+        r"<sheets>.*?</sheets>",
+        lambda m: f"<sheets>{keep_tag}</sheets>",
+        workbook,
+        flags=re.S,
+    )
+    workbook = re.sub(r'\b(activeTab|firstSheet)="\d+"', r'\1="0"', workbook)
 
-def split_single_excel(file_path, output_root_folder):
+    other_names = [name for i, name in enumerate(sheet_names) if i != keep_index]
+
+    def fix_defined_name(match):
+        tag, text = match.group(1), match.group(2)
+        local_id = re.search(r'localSheetId="(\d+)"', tag)
+        if local_id:
+            if int(local_id.group(1)) != keep_index:
+                return ""
+            tag = tag.replace(local_id.group(0), 'localSheetId="0"')
+        refs = html.unescape(text)
+        if any(
+            re.search(rf"(?<![\w.']){re.escape(name)}!", refs) or f"'{name}'!" in refs
+            for name in other_names
+        ):
+            return ""
+        return f"{tag}{text}</definedName>"
+
+    workbook = re.sub(
+        r"(<definedName\b[^>]*>)(.*?)</definedName>",
+        fix_defined_name,
+        workbook,
+        flags=re.S,
+    )
+    workbook = re.sub(r"<definedNames>\s*</definedNames>", "", workbook)
+
+    workbook_rels = "".join(
+        re.split(r"(<Relationship\b[^>]*/>)", workbook_rels)[0:1]
+        + [tag for tag in rel_tags if xml_attrs(tag)["Id"] not in dropped_rids]
+        + ["</Relationships>"]
+    )
+
+    content_types = re.sub(
+        r"<Override\b[^>]*/>",
+        lambda m: (
+            ""
+            if xml_attrs(m.group(0))["PartName"].lstrip("/") in dropped
+            else m.group(0)
+        ),
+        content_types,
+    )
+    root_rels = re.sub(
+        r"<Relationship\b[^>]*/>",
+        lambda m: (
+            ""
+            if part_path(xml_attrs(m.group(0))["Target"], base="") in dropped
+            else m.group(0)
+        ),
+        root_rels,
+    )
+
+    rewritten = {
+        "xl/workbook.xml": workbook,
+        "xl/_rels/workbook.xml.rels": workbook_rels,
+        "[Content_Types].xml": content_types,
+        "_rels/.rels": root_rels,
+    }
+    return rewritten, dropped
+
+
+def split_single_excel_zip(
+    file_path, output_root_folder, sheet_names=None, verbose=True
+):
+    """
+    zip 级拆分：不解析单元格，直接把 xlsx 当作 zip 包处理。
+    目标 Sheet 的 XML、sharedStrings、styles 等部件原样流式复制，只改写工作簿目录类的小文件，
+    内存占用与 Sheet 大小无关。返回生成的文件路径列表。
+    """
+    file_basename = os.path.basename(file_path)
+    file_name_no_ext = os.path.splitext(file_basename)[0]
+    outputs = []
+
+    if verbose:
+        print(f"--> 正在读取文件：{file_basename}")
+
+    with zipfile.ZipFile(file_path) as zin:
+        workbook = zin.read("xl/workbook.xml").decode("utf-8")
+        all_names = [
+            html.unescape(xml_attrs(tag)["name"])
+            for tag in re.findall(r"<sheet\b[^>]*/>", workbook)
+        ]
+        if verbose:
+            print(f"    检测到 {len(all_names)} 个 Sheet: {all_names}")
+
+        for index, name in enumerate(all_names):
+            if sheet_names is not None and name not in sheet_names:
+                continue
+            rewritten, dropped = build_single_sheet_parts(zin, index)
+
+            new_filename = f"{file_name_no_ext}-{name}.xlsx"
+            output_path = os.path.join(output_root_folder, new_filename)
+            with zipfile.ZipFile(
+                output_path, "w", compression=zipfile.ZIP_DEFLATED
+            ) as zout:
+                for info in zin.infolist():
+                    if info.filename in dropped:
+                        continue
+                    # 写入时 zipfile 会改写 ZipInfo 的偏移量，必须用新的 ZipInfo，不能复用源包的
+                    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+                    new_info.compress_type = zipfile.ZIP_DEFLATED
+                    new_info.external_attr = info.external_attr
+                    if info.filename in rewritten:
+                        zout.writestr(
+                            new_info, rewritten[info.filename].encode("utf-8")
+                        )
+                        continue
+                    with zin.open(info) as src, zout.open(new_info, "w") as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+            outputs.append(output_path)
+            if verbose:
+                print(f"    ✅ 已保存: {new_filename}")
+
+    return outputs
+
+
+def split_single_excel(file_path, output_root_folder, verbose=True):
     """
     处理单个 Excel 文件：读取 Sheet，保留格式拆分，按 '文件名-Sheet名' 保存
+    返回生成的文件路径列表
     """
     # 1. 获取基础文件名 (用于命名新文件)
     file_basename = os.path.basename(file_path)  # 例如: a.xlsx
     file_name_no_ext = os.path.splitext(file_basename)[0]  # 例如: a
 
-    print(f"--> 正在读取文件：{file_basename}")
+    if verbose:
+        print(f"--> 正在读取文件：{file_basename}")
+    outputs = []
 
-    try:
-        # 2. 第一次加载：仅为了获取 Sheet 名称列表 (read_only 模式速度快)
-        wb_readonly = openpyxl.load_workbook(file_path, read_only=True)
-        sheet_names = wb_readonly.sheetnames
-        wb_readonly.close()
+    # 2. 第一次加载：仅为了获取 Sheet 名称列表 (read_only 模式速度快)
+    wb_readonly = openpyxl.load_workbook(file_path, read_only=True)
+    sheet_names = wb_readonly.sheetnames
+    wb_readonly.close()
 
+    if verbose:
         print(f"    检测到 {len(sheet_names)} 个 Sheet: {sheet_names}")
 
-        # 3. 循环处理每个 Sheet
-        for target_sheet in sheet_names:
-            # 重新加载完整的工作簿 (为了保留格式，必须 data_only=False)
-            # 注意：对于大文件，反复加载会比较慢，但这是openpyxl保留样式的唯一方法
-            wb = openpyxl.load_workbook(file_path, data_only=False)
+    # 3. 循环处理每个 Sheet
+    for target_sheet in sheet_names:
+        # 重新加载完整的工作簿 (为了保留格式，必须 data_only=False)
+        # 注意：对于大文件，反复加载会比较慢，但这是openpyxl保留样式的唯一方法
+        wb = openpyxl.load_workbook(file_path, data_only=False)
 
-            # 遍历工作簿中的所有 Sheet，删除不需要的
-            for sheet in wb.sheetnames:
-                if sheet != target_sheet:
-                    del wb[sheet]
+        # 遍历工作簿中的所有 Sheet，删除不需要的
+        for sheet in wb.sheetnames:
+            if sheet != target_sheet:
+                del wb[sheet]
 
-            # 4. 构建新的文件名：原文件名-Sheet名.xlsx
-            new_filename = f"{file_name_no_ext}-{target_sheet}.xlsx"
-            output_path = os.path.join(output_root_folder, new_filename)
+        # 4. 构建新的文件名：原文件名-Sheet名.xlsx
+        new_filename = f"{file_name_no_ext}-{target_sheet}.xlsx"
+        output_path = os.path.join(output_root_folder, new_filename)
 
-            # 保存
-            wb.save(output_path)
-            wb.close()
+        # 保存
+        wb.save(output_path)
+        wb.close()
+        outputs.append(output_path)
+        if verbose:
             print(f"    ✅ 已保存: {new_filename}")
 
+    return outputs
+
+
+def split_task(file_path, output_root_folder, engine, sheet_names=None):
+    """
+    进程池中执行的任务：拆分一个文件 (或其中的一组 Sheet)
+    返回 (文件路径, 生成的文件列表, 耗时秒数, 错误信息)
+    """
+    start = time.perf_counter()
+    try:
+        if engine == "copy":
+            outputs = split_single_excel_copy(
+                file_path, output_root_folder, sheet_names, verbose=False
+            )
+        elif engine == "zip":
+            outputs = split_single_excel_zip(
+                file_path, output_root_folder, sheet_names, verbose=False
+            )
+        else:
+            outputs = split_single_excel(file_path, output_root_folder, verbose=False)
+        error = None
     except Exception as e:
-        print(f"    ❌ 处理文件 {file_basename} 时发生错误: {e}")
+        outputs, error = [], str(e)
+    return file_path, outputs, time.perf_counter() - start, error
+
+
+def plan_tasks(file_paths, engine, jobs):
+    """
+    生成任务列表：默认每个文件一个任务；
+    copy / zip 模式下的大文件按 Sheet 分成 jobs 组，由多个进程各自解析后拆分其中一组
+    """
+    tasks = []
+    for file_path in file_paths:
+        if engine in ("copy", "zip") and os.path.getsize(file_path) >= LARGE_FILE_BYTES:
+            wb_readonly = openpyxl.load_workbook(file_path, read_only=True)
+            sheet_names = wb_readonly.sheetnames
+            wb_readonly.close()
+            if len(sheet_names) > 1:
+                groups = min(jobs, len(sheet_names))
+                for i in range(groups):
+                    tasks.append((file_path, sheet_names[i::groups]))
+                continue
+        tasks.append((file_path, None))
+    return tasks
+
+
+def format_size(num_bytes):
+    return f"{num_bytes / 1024 / 1024:.1f}MB"
 
 
-def process_folder(folder_path):
+def process_folder_parallel(file_paths, output_root_folder, engine, jobs):
+    """
+    进程池并行拆分 (openpyxl 解析是 CPU 密集型，多线程无效)，
+    显示统一进度条，结束后输出每个文件的耗时与大小报告
+    """
+    tasks = plan_tasks(file_paths, engine, jobs)
+    report = {
+        file_path: {"outputs": [], "seconds": 0.0, "errors": []}
+        for file_path in file_paths
+    }
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(split_task, file_path, output_root_folder, engine, names)
+            for file_path, names in tasks
+        ]
+        with tqdm(total=len(futures), unit="任务", ncols=100) as pbar:
+            for future in as_completed(futures):
+                file_path, outputs, seconds, error = future.result()
+                entry = report[file_path]
+                entry["outputs"].extend(outputs)
+                entry["seconds"] += seconds
+                if error:
+                    entry["errors"].append(error)
+                    tqdm.write(
+                        f"    ❌ 处理文件 {os.path.basename(file_path)} 时发生错误: {error}"
+                    )
+                pbar.update(1)
+
+    print("\n📊 文件报告 (耗时为该文件各任务耗时之和)：")
+    for file_path, entry in report.items():
+        output_bytes = sum(os.path.getsize(p) for p in entry["outputs"])
+        status = "❌" if entry["errors"] else "✅"
+        print(
+            f"    {status} {os.path.basename(file_path)}: "
+            f"{len(entry['outputs'])} 个 Sheet, {entry['seconds']:.1f}s, "
+            f"{format_size(os.path.getsize(file_path))} -> {format_size(output_bytes)}"
+        )
+
+
+def process_folder(folder_path, engine="copy", jobs=1):
     """
     遍历文件夹并处理所有 Excel 文件
     """
@@ -84,17 +523,33 @@ def process_folder(folder_path):
 
     print(f"共发现 {len(files)} 个 Excel 文件，开始处理...\n" + "=" * 30)
 
-    for file_name in files:
-        full_file_path = os.path.join(folder_path, file_name)
-        split_single_excel(full_file_path, output_root_folder)
-        print("-" * 30)
+    if jobs > 1:
+        file_paths = [os.path.join(folder_path, f) for f in files]
+        process_folder_parallel(file_paths, output_root_folder, engine, jobs)
+    else:
+        for file_name in files:
+            full_file_path = os.path.join(folder_path, file_name)
+            try:
+                if engine == "copy":
+                    split_single_excel_copy(full_file_path, output_root_folder)
+                elif engine == "zip":
+                    split_single_excel_zip(full_file_path, output_root_folder)
+                else:
+                    split_single_excel(full_file_path, output_root_folder)
+            except Exception as e:
+                print(f"    ❌ 处理文件 {file_name} 时发生错误: {e}")
+            print("-" * 30)
 
     print(f"\n🎉 所有任务完成！文件已保存在: {output_root_folder}")
 
 
-if __name__ == "__main__":
-    # 获取参数中的路径，如果没有指定，则使用当前代码所在的目录
-    target_dir = config.dir
+def main():
+    # 进程池的子进程会重新导入本模块，命令行解析放在 main 里，避免子进程重复解析
+    config = parser.parse_args()
 
     # 开始处理
-    process_folder(target_dir)
+    process_folder(config.dir, config.engine, max(1, config.jobs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import pytest
+
+from local_classifier import KeywordClassifier, LocalClassifier
+
+THRESHOLD = 0.75  # 与 questions_classification.LOCAL_THRESHOLD 的默认值一致
+
+
+@pytest.fixture(scope="module")
+def keywords():
+    return KeywordClassifier()
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        # 通信/电网题目里出现的通用词不能把题目判到计算机类
+        "光纤通信中检查点的作用",
+        "在通信系统中，调度进程如何分配信道资源",
+        "电网调度自动化系统中的控制器",
+        "数据库日志文件一般存放在哪里",
+        "以下哪种调制方式抗噪声能力最强",
+    ],
+)
+def test_generic_words_go_to_api(question):
+    classifier = LocalClassifier(THRESHOLD)
+    assert classifier.classify_many([question]) == [None]
+
+
+def test_single_hit_below_threshold(keywords):
+    category, confidence = keywords.predict("什么是死锁")
+    assert category == "25 进程与线程管理"
+    assert confidence < THRESHOLD
+
+
+def test_two_hits_in_same_category(keywords):
+    category, confidence = keywords.predict("二叉树的先序遍历序列为 ABDCE")
+    assert category == "5 树和二叉树"
+    assert confidence >= THRESHOLD
+
+
+def test_conflicting_hits_lower_confidence(keywords):
+    _, pure = keywords.predict("用邻接矩阵求最小生成树")
+    _, mixed = keywords.predict("用邻接矩阵求最小生成树，再对结果做快速排序")
+    assert mixed < pure
+    assert mixed < THRESHOLD
+
+
+def test_ascii_keywords_match_whole_words(keywords):
+    # ASK 不能命中 task
+    assert keywords.predict("the task scheduler") == (None, 0.0)
+    category, _ = keywords.predict("ASK 与 FSK 信号的带宽比较")
+    assert category == "5 调制解调技术"
+
+
+def test_classify_many_keeps_order():
+    classifier = LocalClassifier(THRESHOLD)
+    results = classifier.classify_many(
+        ["电网调度自动化系统中的控制器", "冒泡排序和快速排序哪个更稳定"]
+    )
+    assert results == [None, "8 内部排序"]
+    assert classifier.stats["keyword"] == 1
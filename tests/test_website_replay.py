@@ -0,0 +1,207 @@
+"""
+website_auto_fill 接口录制/回放：用本地模拟的 RuoYi 题库接口代替真实网站，
+伪造 Playwright 录到的请求对象，验证 build_capture 生成的模板能正确重放
+"""
+
+import asyncio
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+import website_auto_fill as w
+
+TOKEN = "tok"
+
+
+def make_db():
+    return {
+        i: {
+            "id": i,
+            "questionName": f"题目{i}",
+            "analysis": "",
+            "answer": "A",
+            "categoryId": 297,
+            "options": f"opt{i}",
+        }
+        for i in range(1, 31)
+    }
+
+
+class QuestionApi(BaseHTTPRequestHandler):
+    """列表 / 详情 / 修改 三个接口；列表不返回 options，修改时必须原样带回"""
+
+    db = {}
+
+    def log_message(self, *args):
+        pass
+
+    def authorized(self):
+        return self.headers.get(
+            "Authorization"
+        ) == f"Bearer {TOKEN}" and f"Admin-Token={TOKEN}" in (
+            self.headers.get("Cookie") or ""
+        )
+
+    def send(self, obj, status=200):
+        body = json.dumps(obj, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.authorized():
+            return self.send({"code": 401, "msg": "认证失败"})
+        url = urlsplit(self.path)
+        if url.path == "/prod-api/system/question/list":
+            name = parse_qs(url.query).get("questionName", [""])[0]
+            rows = [
+                {k: v for k, v in r.items() if k != "options"}
+                for r in self.db.values()
+                if name in r["questionName"]
+            ]
+            return self.send({"code": 200, "total": len(rows), "rows": rows[:10]})
+        match = re.match(r"/prod-api/system/question/(\d+)$", url.path)
+        if match:
+            return self.send({"code": 200, "data": self.db[int(match.group(1))]})
+        self.send({"code": 404}, 404)
+
+    def do_PUT(self):
+        if not self.authorized():
+            return self.send({"code": 401, "msg": "认证失败"})
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        row = self.db[body["id"]]
+        if body.get("options") != row["options"]:
+            return self.send({"code": 500, "msg": "缺少选项"})
+        row.update(body)
+        self.send({"code": 200, "msg": "操作成功"})
+
+
+@pytest.fixture
+def server():
+    QuestionApi.db = make_db()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), QuestionApi)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/prod-api/system/question"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    async def json(self):
+        return self.data
+
+
+class FakeRequest:
+    """模拟 playwright 的 Request：只实现 build_capture 用到的属性"""
+
+    def __init__(self, method, url, body=None, resource_type="xhr"):
+        self.method = method
+        self.url = url
+        self.body = body
+        self.resource_type = resource_type
+
+    @property
+    def post_data_json(self):
+        return self.body
+
+    async def response(self):
+        r = httpx.request(
+            self.method,
+            self.url,
+            json=self.body,
+            headers={"Authorization": f"Bearer {TOKEN}"},
+            cookies={"Admin-Token": TOKEN},
+        )
+        return FakeResponse(r.json())
+
+    async def all_headers(self):
+        return {
+            "authorization": f"Bearer {TOKEN}",
+            ":method": self.method,
+            "cookie": "ignored",
+            "content-type": "application/json;charset=UTF-8",
+        }
+
+
+class FakeContext:
+    async def cookies(self):
+        return [{"name": "Admin-Token", "value": TOKEN}]
+
+
+class FakePage:
+    def on(self, event, callback):
+        self.emit = callback
+
+
+def record_first_question(base):
+    """按页面操作顺序喂给 XhrRecorder：搜索 题目1 -> 打开详情 -> 保存 解析1"""
+    page = FakePage()
+    recorder = w.XhrRecorder(page)
+    recorder.phase = "search"
+    page.emit(FakeRequest("GET", base + "/list?pageNum=1&pageSize=10"))
+    page.emit(
+        FakeRequest("GET", base + "/list?pageNum=1&pageSize=10&questionName=题目1")
+    )
+    recorder.phase = "detail"
+    page.emit(FakeRequest("GET", base + "/1"))
+    page.emit(FakeRequest("GET", base + "/logo.png", resource_type="image"))
+    recorder.phase = "update"
+    body = dict(QuestionApi.db[1], analysis="解析1")
+    page.emit(FakeRequest("PUT", base, body))
+    return recorder
+
+
+def test_build_capture(server):
+    recorder = record_first_question(server)
+    capture = asyncio.run(w.build_capture(recorder, FakeContext(), "题目1", "解析1"))
+
+    search = capture["search"]
+    assert search["url"] == server + "/list"
+    assert ["questionName", w.QUESTION_MARKER] in search["params"]
+    assert search["rows_path"] == ["rows"]
+    assert search["question_field"] == "questionName"
+    assert capture["detail"]["url"] == f"{server}/{w.ID_MARKER}"
+    assert capture["detail"]["object_path"] == ["data"]
+    assert capture["update"]["analysis_field"] == "analysis"
+    assert capture["update"]["id_field"] == "id"
+    assert "cookie" not in capture["headers"]
+    assert capture["cookies"] == {"Admin-Token": TOKEN}
+
+
+def test_replay_all(server, tmp_path):
+    recorder = record_first_question(server)
+    capture = asyncio.run(w.build_capture(recorder, FakeContext(), "题目1", "解析1"))
+    path = tmp_path / "capture.json"
+    w.save_capture(capture, path)
+    with open(path, encoding="utf-8") as f:
+        capture = json.load(f)
+
+    rows = [(i, f"题目{i}", f"解析{i}") for i in range(2, 21)]
+    rows.append((21, "不存在的题", "x"))
+    asyncio.run(w.replay_all(capture, rows, concurrency=4))
+
+    db = QuestionApi.db
+    assert all(db[i]["analysis"] == f"解析{i}" for i in range(2, 21))
+    # 详情里的字段 (options) 要原样带回，其他题目不能被改动
+    assert all(db[i]["options"] == f"opt{i}" for i in range(2, 21))
+    assert all(db[i]["analysis"] == "" for i in range(21, 31))
+
+
+def test_replay_reports_expired_login(server, capsys):
+    recorder = record_first_question(server)
+    capture = asyncio.run(w.build_capture(recorder, FakeContext(), "题目1", "解析1"))
+    capture["cookies"] = {"Admin-Token": "expired"}
+    asyncio.run(w.replay_all(capture, [(2, "题目2", "解析2")], concurrency=1))
+
+    assert QuestionApi.db[2]["analysis"] == ""
+    assert "登录可能已过期" in capsys.readouterr().out
@@ -0,0 +1,200 @@
+"""
+题目文本去重工具 (merge_excel.py / question_dedup.py 共用)
+
+- normalize_text: 全半角统一、去空白与标点、转小写，消除排版差异
+- MinHasher: 字符 n-gram 的 MinHash 签名 (numpy 向量化，不依赖第三方库)
+- LSHIndex: 按 band 分桶的 LSH 索引，查询只比较同桶的候选，整体为近线性复杂度
+- DuplicateIndex: 完全重复 (哈希) + 可选近似重复 (MinHash/LSH) 的增量索引
+- UnionFind: 把两两重复关系合并成重复簇
+"""
+
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+
+# 梅森素数 2^61-1，MinHash 的线性哈希族 (a*x + b) mod P
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_NGRAM = 3
+
+# 去掉空白与常见中英文标点
+_STRIP_PATTERN = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_text(text):
+    """统一全半角与大小写，去掉空白和标点"""
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return _STRIP_PATTERN.sub("", text)
+
+
+def text_key(text):
+    """规范化文本的哈希，用于完全重复判断"""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def shingles(text, n=DEFAULT_NGRAM):
+    """规范化文本的字符 n-gram 集合 (短文本退化为整串)"""
+    text = normalize_text(text)
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class MinHasher:
+    """固定随机种子的 MinHash 签名生成器，同一参数生成的签名可跨进程、跨运行比较"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, ngram=DEFAULT_NGRAM, seed=1):
+        self.num_perm = num_perm
+        self.ngram = ngram
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        grams = shingles(text, self.ngram)
+        if not grams:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        hashes = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little"
+                )
+                for g in grams
+            ],
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME
+        return (permuted & MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def estimate_similarity(sig_a, sig_b):
+    """两个 MinHash 签名估计的 Jaccard 相似度"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def optimal_bands(num_perm, threshold):
+    """
+    选择 band 数 b 与每个 band 的行数 r (b*r = num_perm)，
+    使 LSH 的 S 曲线拐点 (1/b)^(1/r) 最接近且不高于阈值
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        knee = (1 / bands) ** (1 / rows)
+        score = abs(knee - threshold) + (0.5 if knee > threshold else 0)
+        if best is None or score < best[0]:
+            best = (score, bands, rows)
+    return best[1], best[2]
+
+
+class LSHIndex:
+    """MinHash 签名的 LSH 分桶索引"""
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, threshold=0.8):
+        self.bands, self.rows = optimal_bands(num_perm, threshold)
+        self.buckets = {}
+
+    def _keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start : start + self.rows].tobytes()
+
+    def insert(self, key, signature):
+        for bucket in self._keys(signature):
+            self.buckets.setdefault(bucket, []).append(key)
+
+    def query(self, signature):
+        """与 signature 至少有一个 band 完全相同的候选 key (去重，按插入顺序)"""
+        seen = {}
+        for bucket in self._keys(signature):
+            for key in self.buckets.get(bucket, ()):
+                seen.setdefault(key, None)
+        return list(seen)
+
+
+class DuplicateIndex:
+    """
+    增量重复检测索引：先查完全重复，再 (可选) 查近似重复。
+    find() 返回 (类型 "exact"/"near", 首次出现的 ref, 相似度)，未重复时返回 None。
+    """
+
+    def __init__(self, near_threshold=None, num_perm=DEFAULT_NUM_PERM):
+        self.near_threshold = near_threshold
+        self.exact = {}
+        self.hasher = MinHasher(num_perm) if near_threshold else None
+        self.lsh = LSHIndex(num_perm, near_threshold) if near_threshold else None
+        self.signatures = {}
+
+    def find(self, text, signature=None):
+        key = text_key(text)
+        if key in self.exact:
+            return "exact", self.exact[key], 1.0
+        if self.lsh is None:
+            return None
+        if signature is None:
+            signature = self.hasher.signature(text)
+        best = None
+        for ref in self.lsh.query(signature):
+            similarity = estimate_similarity(signature, self.signatures[ref])
+            if similarity >= self.near_threshold and (
+                best is None or similarity > best[2]
+            ):
+                best = ("near", ref, similarity)
+        return best
+
+    def add(self, text, ref, signature=None):
+        key = text_key(text)
+        self.exact.setdefault(key, ref)
+        if self.lsh is not None:
+            if signature is None:
+                signature = self.hasher.signature(text)
+            self.signatures[ref] = signature
+            self.lsh.insert(ref, signature)
+
+    def check(self, text, ref):
+        """查找重复；未重复时把 text 以 ref 加入索引 (签名只计算一次)"""
+        signature = self.hasher.signature(text) if self.lsh is not None else None
+        found = self.find(text, signature)
+        if found is None:
+            self.add(text, ref, signature)
+        elif found[0] == "near":
+            # 近似重复的行不进 LSH，但登记其精确键，之后与它完全相同的行仍判为完全重复
+            self.exact.setdefault(text_key(text), ref)
+        return found
+
+
+class UnionFind:
+    """并查集：把两两重复关系合并为重复簇"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        """合并 a、b 所在的簇，a 所在簇的代表保留为新簇的代表"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def clusters(self):
+        """{代表元素: [成员...]}，只包含成员数大于 1 的簇"""
+        groups = {}
+        for x in list(self.parent):
+            groups.setdefault(self.find(x), []).append(x)
+        return {root: members for root, members in groups.items() if len(members) > 1}
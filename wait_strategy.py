@@ -0,0 +1,175 @@
+"""
+Playwright 脚本共用的等待策略 (auto_add_questions.py / website_auto_fill.py / auto_delete.py)
+
+用具体的页面信号代替固定的 wait_for_timeout：
+- wait_for_loading: 等 Element UI 的 el-loading-mask 全部隐藏 (表格刷新完成)
+- expect_xhr: 执行操作并等待它触发的 XHR 响应 (如搜索、删除后的表格请求)
+- wait_for_dialog / wait_for_fewer: 等弹窗出现/关闭、元素数量减少
+每个函数都有同步版与 *_async 异步版；超时不抛异常，只返回 False/None，由调用方决定是否继续。
+
+StepTimer 统计每个步骤的耗时，运行结束后打印时间都花在了哪里。
+launch_options(fast) 生成浏览器启动参数，--fast 时去掉 slow_mo。
+"""
+
+import time
+from contextlib import contextmanager
+
+LOADING_MASK = ".el-loading-mask"
+DEFAULT_TIMEOUT = 10000  # 毫秒
+
+# 页面上还有可见的加载遮罩时返回 false (display:none 的元素没有 client rect)
+_NO_VISIBLE_MASK_JS = (
+    "sel => Array.from(document.querySelectorAll(sel))"
+    ".every(el => el.getClientRects().length === 0)"
+)
+
+
+def launch_options(fast, slow_mo, **extra):
+    """chromium.launch 的参数：有头模式，--fast 时不加慢动作"""
+    options = {"headless": False, "slow_mo": 0 if fast else slow_mo}
+    options.update(extra)
+    return options
+
+
+def _is_xhr(url_part):
+    def predicate(response):
+        return response.request.resource_type in ("xhr", "fetch") and (
+            url_part is None or url_part in response.url
+        )
+
+    return predicate
+
+
+def _is_timeout(error):
+    # playwright 的 TimeoutError 在同步/异步两套 API 中是不同的类，按类名判断
+    return type(error).__name__ == "TimeoutError"
+
+
+# ================= 同步版 =================
+
+
+def wait_for_loading(page, timeout=DEFAULT_TIMEOUT):
+    """等待所有加载遮罩隐藏；超时返回 False"""
+    try:
+        page.wait_for_function(_NO_VISIBLE_MASK_JS, arg=LOADING_MASK, timeout=timeout)
+        return True
+    except Exception as e:
+        if _is_timeout(e):
+            return False
+        raise
+
+
+def expect_xhr(page, action, url_part=None, timeout=DEFAULT_TIMEOUT):
+    """
+    执行 action() 并等待其触发的第一个 XHR 响应 (url_part 为空时匹配任意 XHR)，
+    再等加载遮罩消失。返回响应对象；没有等到请求时返回 None。
+    """
+    response = None
+    try:
+        with page.expect_response(_is_xhr(url_part), timeout=timeout) as info:
+            action()
+        response = info.value
+    except Exception as e:
+        if not _is_timeout(e):
+            raise
+    wait_for_loading(page, timeout)
+    return response
+
+
+def wait_for_dialog(locator, state="visible", timeout=DEFAULT_TIMEOUT):
+    """等待弹窗进入 visible / hidden 状态；超时返回 False"""
+    try:
+        locator.wait_for(state=state, timeout=timeout)
+        return True
+    except Exception as e:
+        if _is_timeout(e):
+            return False
+        raise
+
+
+def wait_for_fewer(locator, count, timeout=DEFAULT_TIMEOUT):
+    """等待 locator 匹配的元素少于 count 个 (第 count 个元素被移除)"""
+    if count <= 0:
+        return True
+    return wait_for_dialog(locator.nth(count - 1), "detached", timeout)
+
+
+# ================= 异步版 =================
+
+
+async def wait_for_loading_async(page, timeout=DEFAULT_TIMEOUT):
+    try:
+        await page.wait_for_function(
+            _NO_VISIBLE_MASK_JS, arg=LOADING_MASK, timeout=timeout
+        )
+        return True
+    except Exception as e:
+        if _is_timeout(e):
+            return False
+        raise
+
+
+async def expect_xhr_async(page, action, url_part=None, timeout=DEFAULT_TIMEOUT):
+    """异步版 expect_xhr，action 为无参协程函数"""
+    response = None
+    try:
+        async with page.expect_response(_is_xhr(url_part), timeout=timeout) as info:
+            await action()
+        response = await info.value
+    except Exception as e:
+        if not _is_timeout(e):
+            raise
+    await wait_for_loading_async(page, timeout)
+    return response
+
+
+async def wait_for_dialog_async(locator, state="visible", timeout=DEFAULT_TIMEOUT):
+    try:
+        await locator.wait_for(state=state, timeout=timeout)
+        return True
+    except Exception as e:
+        if _is_timeout(e):
+            return False
+        raise
+
+
+async def wait_for_fewer_async(locator, count, timeout=DEFAULT_TIMEOUT):
+    if count <= 0:
+        return True
+    return await wait_for_dialog_async(locator.nth(count - 1), "detached", timeout)
+
+
+# ================= 耗时统计 =================
+
+
+class StepTimer:
+    """
+    按步骤累计耗时：
+        with timer.step("搜索"):
+            ...
+    同步、异步代码里都可以用 (with 块中可以 await)
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"\n⏱️ 步骤耗时 (总计 {elapsed:.1f}s)：")
+        for name, total in sorted(self.totals.items(), key=lambda x: -x[1]):
+            count = self.counts[name]
+            print(
+                f"    {name}: {total:.1f}s / {count} 次, 平均 {total / count:.2f}s, "
+                f"占 {total / max(elapsed, 1e-9) * 100:.0f}%"
+            )
@@ -3,13 +3,31 @@
 
 使用方法：
 python website_auto_fill.py --file "res_通信-第一章信息新技术(1).xlsx" --url https://cwgedu.cn/powerTutoring-ui/#/addAnswerSubjectQuestion/index/297/2
+
+接口回放模式 (--mode api)：
+手动登录后，第一道题仍在页面上操作，同时录下网站背后的 搜索 / 题目详情 / 修改 三个 XHR 请求，
+保存到 --capture-file (含登录 Cookie 与请求头，注意不要外传)；其余题目直接用 httpx 连接池
+带着浏览器的会话重放这些请求，不再逐题刷新页面。
+登录未过期时可以用 --replay-only 跳过浏览器，直接用已保存的录制文件批量更新。
 """
 
 import asyncio
-from playwright.async_api import async_playwright
+import json
+import time
+from urllib.parse import parse_qsl, unquote, urlsplit, urlunsplit
+
+import httpx
 from openpyxl import load_workbook
 import argparse
 
+from wait_strategy import (
+    StepTimer,
+    expect_xhr_async,
+    launch_options,
+    wait_for_dialog_async,
+    wait_for_loading_async,
+)
+
 # ================= 配置区域 =================
 parser = argparse.ArgumentParser(description="自动上传解析")
 parser.add_argument(
@@ -24,35 +42,60 @@ parser.add_argument(
     default="https://cwgedu.cn/powerTutoring-ui/#/addAnswerSubjectQuestion/index/294/2",
     help="网站url",
 )
-config = parser.parse_args()
+parser.add_argument(
+    "--mode",
+    choices=["ui", "api"],
+    default="ui",
+    help="ui: 逐题在页面上操作；api: 录制第一题的接口请求后直接重放",
+)
+parser.add_argument(
+    "--capture-file",
+    type=str,
+    default="website_api_capture.json",
+    help="接口录制文件 (含登录 Cookie)",
+)
+parser.add_argument(
+    "--replay-only",
+    action="store_true",
+    help="不打开浏览器，直接用已有的录制文件重放 (需登录未过期)",
+)
+parser.add_argument(
+    "--concurrency", type=int, default=8, help="接口回放时同时在途的请求数"
+)
+parser.add_argument(
+    "--fast", action="store_true", help="去掉 slow_mo 慢动作，只靠页面信号等待"
+)
 
 
 # ================= 配置区域 =================
-# 1. 这里填你【另存为】后的 xlsx 文件名
-DATA_FILE = config.file
+# 1. xlsx 文件名 (--file) 与网站地址 (--url) 通过命令行传入
 
-# 2. 你的网站地址
-TARGET_URL = config.url
-
-# 3. 列名配置 (必须和Excel第一行表头完全一致)
+# 2. 列名配置 (必须和Excel第一行表头完全一致)
 COL_QUESTION_NAME = "题目名称"
 COL_ANALYSIS_NAME = "解析"
+
+# 3. 接口回放：录制文件中的占位符
+QUESTION_MARKER = "{{question}}"
+ID_MARKER = "{{id}}"
+# 回放时不转发的请求头 (由 httpx 自动生成)
+SKIP_HEADERS = {"cookie", "content-length", "host", "connection", "accept-encoding"}
 # ===========================================
 
 
-async def run():
-    print(f"正在使用 openpyxl 读取文件: {DATA_FILE}...")
+def load_rows(data_file):
+    """读取 Excel，返回 [(行号, 题目, 解析)]；失败时返回 None"""
+    print(f"正在使用 openpyxl 读取文件: {data_file}...")
 
     try:
         # 加载 Excel 文件 (data_only=True 确保读取的是值而不是公式)
-        wb = load_workbook(filename=DATA_FILE, data_only=True)
+        wb = load_workbook(filename=data_file, data_only=True)
         sheet = wb.active  # 获取第一个工作表
     except Exception as e:
         print(f"❌ 读取文件失败: {e}")
         print(
             "请确认：\n1. 文件名写对了吗？\n2. 文件是 .xlsx 格式吗？(openpyxl 不支持 csv)"
         )
-        return
+        return None
 
     # === 获取表头，找到“题目名称”和“解析”在第几列 ===
     # openpyxl 的索引从 1 开始
@@ -71,18 +114,461 @@ async def run():
     except ValueError as e:
         print(f"❌ 错误：在表头中没找到指定的列名。")
         print(f"Excel里的表头是: {headers}")
+        return None
+
+    # min_row=2 表示从第2行开始读（跳过表头）
+    # values_only=True 直接获取单元格的值
+    rows = []
+    for i, row in enumerate(sheet.iter_rows(min_row=2, values_only=True)):
+        # 获取当前行的题目和解析
+        # 注意：row 是一个元组，索引对应之前的 headers 索引
+        question_text = str(row[q_index]).strip() if row[q_index] is not None else ""
+        analysis_text = str(row[a_index]).strip() if row[a_index] is not None else ""
+
+        # 跳过无效数据
+        if not question_text or question_text == "None":
+            continue
+        if analysis_text == "None":
+            analysis_text = ""
+        rows.append((i + 1, question_text, analysis_text))
+    return rows
+
+
+async def update_via_ui(page, question_text, analysis_text, timer, recorder=None):
+    """在页面上搜索题目并修改解析；recorder 不为空时标记各阶段触发的 XHR"""
+
+    def phase(name):
+        if recorder is not None:
+            recorder.phase = name
+
+    # ==========================================
+    # --- A. 搜索 (终极稳定版) ---
+    # ==========================================
+
+    # 1. 定位：找到包含“题目名称”文字的那个区域，再找里面的input
+    print("刷新页面...")
+    search_item = page.locator(".el-form-item").filter(has_text="题目名称")
+    search_input = search_item.locator("input")
+    with timer.step("刷新页面"):
+        await page.reload()
+        # 刷新后等搜索框出现、表格首次加载完成
+        await search_input.wait_for(state="visible")
+        await wait_for_loading_async(page)
+
+    # 输入新题目
+    phase("search")
+    await search_input.fill(question_text)
+
+    # 4. 等待加载：等回车触发的搜索请求返回、加载遮罩消失
+    with timer.step("搜索"):
+        await expect_xhr_async(page, lambda: search_input.press("Enter"))
+
+    # --- B. 点击修改 ---
+    target_row = page.locator("tr").filter(has_text=question_text)
+    edit_btn = target_row.locator('button:has-text("修改")')
+
+    if await edit_btn.count() > 0:
+        phase("detail")
+        await edit_btn.first.scroll_into_view_if_needed()
+        await edit_btn.first.click()
+    else:
+        print(f"   -> [跳过] 没找到对应题目: {question_text[:10]}")
+        phase(None)
+        return False
+
+    # --- C. 填写解析 ---
+    analysis_box = page.locator('textarea[placeholder="请输入解析"]')
+    with timer.step("打开弹窗"):
+        await analysis_box.wait_for(state="visible", timeout=5000)
+
+    await analysis_box.clear()
+    await analysis_box.fill(analysis_text)
+
+    # --- D. 保存 ---
+    # --- D. 保存 (最终修复版) ---
+    print("   -> 正在尝试保存...")
+
+    # 1. 锁定弹窗底部区域 (el-dialog__footer)
+    # 这一步是为了确保我们点的是弹窗里的按钮，而不是页面背后的
+    dialog_footer = page.locator(".el-dialog__footer").filter(
+        has=page.locator(":visible")
+    )
+
+    # 2. 定位按钮
+    # 方案 A: 优先找蓝色的主按钮 (el-button--primary) 且包含 "确" 字的
+    # 注意：这里匹配 "确" 字即可，不管后面有没有空格
+    save_btn = dialog_footer.locator("button.el-button--primary").filter(has_text="确")
+
+    # 方案 B: 如果 A 没找到，尝试找文本完全匹配 "确 定" (带空格) 的按钮
+    if await save_btn.count() == 0:
+        save_btn = dialog_footer.locator('button:has-text("确 定")')
+
+    # 方案 C: 还是没找到？试试不带空格的 "确定" (防止有些题目不一样)
+    if await save_btn.count() == 0:
+        save_btn = dialog_footer.locator('button:has-text("确定")')
+
+    # 3. 执行点击
+    phase("update")
+    if await save_btn.count() > 0:
+        # force=True 强行点击，忽略动画遮挡
+        await save_btn.first.click(force=True)
+    else:
+        print("   -> [警告] 实在找不到保存按钮，尝试盲按回车...")
+        await page.keyboard.press("Enter")
+
+    # --- E. 等待完成 ---
+    with timer.step("保存"):
+        if not await wait_for_dialog_async(analysis_box, "hidden", 5000):
+            raise TimeoutError("保存后弹窗未关闭")
+    phase(None)
+    print("   -> [成功]")
+    return True
+
+
+# ================= 接口录制 =================
+
+
+class XhrRecorder:
+    """记录页面发出的 XHR/fetch 请求，并按当前所处的操作阶段打标签"""
+
+    def __init__(self, page):
+        self.phase = None
+        self.records = []
+        # 在请求发出时打标签，响应晚到也不会被算进下一个阶段
+        page.on("request", self._on_request)
+
+    def _on_request(self, request):
+        if self.phase and request.resource_type in ("xhr", "fetch"):
+            self.records.append((self.phase, request))
+
+    def requests(self, phase):
+        return [request for name, request in self.records if name == phase]
+
+
+def replace_value(obj, old, new):
+    """递归地把 JSON 中等于 old 的字符串替换为 new"""
+    if isinstance(obj, dict):
+        return {k: replace_value(v, old, new) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [replace_value(v, old, new) for v in obj]
+    return new if obj == old else obj
+
+
+def find_rows(data, field_value, path=()):
+    """
+    在搜索接口返回的 JSON 中找到表格数据所在的列表：
+    返回 (列表的路径, 题目文本所在的字段名)，找不到时返回 None
+    """
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict):
+                for key, value in item.items():
+                    if value == field_value:
+                        return list(path), key
+        for i, item in enumerate(data):
+            found = find_rows(item, field_value, path + (i,))
+            if found:
+                return found
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            found = find_rows(value, field_value, path + (key,))
+            if found:
+                return found
+    return None
+
+
+def find_object(data, key, value, path=()):
+    """在详情接口返回的 JSON 中找到 key == value 的对象，返回其路径"""
+    if isinstance(data, dict):
+        if data.get(key) == value:
+            return list(path)
+        items = data.items()
+    elif isinstance(data, list):
+        items = enumerate(data)
+    else:
+        return None
+    for k, v in items:
+        found = find_object(v, key, value, path + (k,))
+        if found is not None:
+            return found
+    return None
+
+
+def follow(data, path):
+    for key in path:
+        data = data[key]
+    return data
+
+
+def split_url(url):
+    """拆分出不带查询串的 url 与查询参数列表"""
+    parts = urlsplit(url)
+    return (
+        urlunsplit((parts.scheme, parts.netloc, parts.path, "", "")),
+        parse_qsl(parts.query, keep_blank_values=True),
+    )
+
+
+def request_json(request):
+    try:
+        return request.post_data_json
+    except Exception:
+        return None
+
+
+async def build_capture(recorder, context, question_text, analysis_text):
+    """根据第一题操作时录下的请求生成可重放的接口模板"""
+    # 1. 搜索：URL 参数或请求体中带有题目文本的请求
+    search = None
+    for request in recorder.requests("search"):
+        body = request_json(request)
+        if question_text in unquote(request.url) or (
+            body is not None and question_text in json.dumps(body, ensure_ascii=False)
+        ):
+            search = request
+    if search is None:
+        raise RuntimeError("没有录到带题目文本的搜索请求")
+    search_data = await (await search.response()).json()
+    found = find_rows(search_data, question_text)
+    if found is None:
+        raise RuntimeError("搜索结果中找不到该题目")
+    rows_path, question_field = found
+    row = next(
+        r
+        for r in follow(search_data, rows_path)
+        if isinstance(r, dict) and r.get(question_field) == question_text
+    )
+    base_url, params = split_url(search.url)
+
+    # 2. 修改：请求体中带有解析文本的请求
+    update = None
+    for request in recorder.requests("update"):
+        body = request_json(request)
+        if isinstance(body, dict) and analysis_text in body.values():
+            update = request
+    if update is None:
+        raise RuntimeError("没有录到带解析文本的保存请求")
+    update_body = request_json(update)
+    analysis_field = next(k for k, v in update_body.items() if v == analysis_text)
+    id_candidates = [
+        k
+        for k, v in update_body.items()
+        if k.lower().endswith("id") and k in row and row[k] == v
+    ]
+    if not id_candidates:
+        raise RuntimeError("无法确定题目 ID 字段")
+    id_field = "id" if "id" in id_candidates else id_candidates[0]
+    question_id = str(row[id_field])
+
+    # 3. 详情 (可选)：打开修改弹窗时按 ID 拉取完整题目的请求
+    detail = None
+    for request in recorder.requests("detail"):
+        if request.method == "GET" and question_id in urlsplit(request.url).path.split(
+            "/"
+        ):
+            detail_data = await (await request.response()).json()
+            object_path = find_object(detail_data, id_field, row[id_field])
+            if object_path is not None:
+                detail_url, detail_params = split_url(request.url)
+                parts = urlsplit(detail_url)
+                path = "/".join(
+                    ID_MARKER if segment == question_id else segment
+                    for segment in parts.path.split("/")
+                )
+                detail = {
+                    "url": urlunsplit(parts._replace(path=path)),
+                    "params": detail_params,
+                    "object_path": object_path,
+                }
+
+    headers = {
+        k: v
+        for k, v in (await update.all_headers()).items()
+        if not k.startswith(":") and k.lower() not in SKIP_HEADERS
+    }
+    cookies = {c["name"]: c["value"] for c in await context.cookies()}
+    return {
+        "search": {
+            "method": search.method,
+            "url": base_url,
+            "params": [
+                [k, QUESTION_MARKER if v == question_text else v] for k, v in params
+            ],
+            "body": replace_value(request_json(search), question_text, QUESTION_MARKER),
+            "rows_path": rows_path,
+            "question_field": question_field,
+        },
+        "detail": detail,
+        "update": {
+            "method": update.method,
+            "url": update.url,
+            "body": update_body,
+            "analysis_field": analysis_field,
+            "id_field": id_field,
+        },
+        "headers": headers,
+        "cookies": cookies,
+    }
+
+
+# ================= 接口回放 =================
+
+
+def api_succeeded(response):
+    """HTTP 2xx，且返回体中的业务码 (若有) 为成功"""
+    if response.status_code >= 300:
+        return False
+    try:
+        data = response.json()
+    except ValueError:
+        return True
+    return not isinstance(data, dict) or data.get("code", 200) in (0, 200)
+
+
+async def replay_one(client, capture, question_text, analysis_text):
+    """搜索 -> (详情) -> 修改；返回 "ok" / "missing" / 失败原因"""
+    search = capture["search"]
+    params = [
+        (k, question_text if v == QUESTION_MARKER else v) for k, v in search["params"]
+    ]
+    body = search["body"]
+    response = await client.request(
+        search["method"],
+        search["url"],
+        params=params,
+        json=(
+            replace_value(body, QUESTION_MARKER, question_text)
+            if body is not None
+            else None
+        ),
+    )
+    response.raise_for_status()
+    rows = follow(response.json(), search["rows_path"]) or []
+    field = search["question_field"]
+    row = next(
+        (
+            r
+            for r in rows
+            if isinstance(r, dict) and str(r.get(field, "")).strip() == question_text
+        ),
+        None,
+    )
+    if row is None:
+        return "missing"
+
+    update = capture["update"]
+    question_id = row[update["id_field"]]
+    current = {}
+    detail = capture["detail"]
+    if detail:
+        response = await client.get(
+            detail["url"].replace(ID_MARKER, str(question_id)),
+            params=detail["params"],
+        )
+        response.raise_for_status()
+        current = follow(response.json(), detail["object_path"])
+
+    # 修改请求体：字段优先取本题详情，其次取搜索结果行，都没有才沿用录制时的值
+    payload = {}
+    for key, value in update["body"].items():
+        if key in current:
+            payload[key] = current[key]
+        elif key in row:
+            payload[key] = row[key]
+        else:
+            payload[key] = value
+    payload[update["id_field"]] = question_id
+    payload[update["analysis_field"]] = analysis_text
+
+    response = await client.request(update["method"], update["url"], json=payload)
+    if not api_succeeded(response):
+        return f"HTTP {response.status_code}: {response.text[:100]}"
+    return "ok"
+
+
+async def replay_all(capture, rows, concurrency):
+    """用连接池并发重放所有题目的更新请求"""
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"ok": 0, "missing": 0, "failed": 0}
+    done = 0
+    total = len(rows)
+    start = time.perf_counter()
+
+    async def worker(row_number, question_text, analysis_text):
+        nonlocal done
+        async with semaphore:
+            try:
+                result = await replay_one(client, capture, question_text, analysis_text)
+            except Exception as e:
+                result = f"{type(e).__name__}: {e}"
+        done += 1
+        prefix = f"[{done}/{total}] 第 {row_number} 行"
+        if result == "ok":
+            counts["ok"] += 1
+            print(f"{prefix} {question_text[:10]}... -> [成功]")
+        elif result == "missing":
+            counts["missing"] += 1
+            print(f"{prefix} -> [跳过] 没找到对应题目: {question_text[:10]}")
+        else:
+            counts["failed"] += 1
+            print(f"{prefix} {question_text[:10]}... -> [错误] {result}")
+
+    async with httpx.AsyncClient(
+        headers=capture["headers"],
+        cookies=capture["cookies"],
+        limits=limits,
+        timeout=30,
+    ) as client:
+        await asyncio.gather(*(worker(*row) for row in rows))
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"\n接口回放完成: 成功 {counts['ok']}，未找到 {counts['missing']}，"
+        f"失败 {counts['failed']}，耗时 {elapsed:.1f}s "
+        f"({len(rows) / max(elapsed, 1e-6) * 60:.0f} 题/分钟)"
+    )
+    if counts["failed"] and counts["failed"] == len(rows) - counts["missing"]:
+        print("⚠️ 全部失败，登录可能已过期：去掉 --replay-only 重新登录录制")
+
+
+def save_capture(capture, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(capture, f, ensure_ascii=False, indent=2)
+    print(f"💾 接口录制已保存: {path} (含登录 Cookie，请勿外传)")
+
+
+async def run(config):
+    rows = load_rows(config.file)
+    if rows is None:
         return
 
+    if config.replay_only:
+        try:
+            with open(config.capture_file, "r", encoding="utf-8") as f:
+                capture = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ 读取录制文件失败: {e}")
+            return
+        await replay_all(capture, rows, config.concurrency)
+        print("\n全部搞定！")
+        return
+
+    # 只在需要浏览器时导入，--replay-only 在没装 Playwright 的机器上也能运行
+    from playwright.async_api import async_playwright
+
     async with async_playwright() as p:
         print("正在启动浏览器...")
-        # 有头模式 + 慢动作
-        browser = await p.chromium.launch(headless=False, slow_mo=800)
+        # 有头模式 + 慢动作 (--fast 时不加慢动作)
+        browser = await p.chromium.launch(**launch_options(config.fast, 800))
         context = await browser.new_context()
         page = await context.new_page()
         await page.set_viewport_size({"width": 1400, "height": 900})
 
         # === 步骤 1: 人工登录 ===
-        await page.goto(TARGET_URL)
+        await page.goto(config.url)
         print("\n" + "=" * 50)
         print("【请手动操作】")
         print("请登录并跳转到【题目列表】页面。")
@@ -90,113 +576,44 @@ async def run():
         print("=" * 50 + "\n")
 
         # === 步骤 2: 循环处理 ===
-        # min_row=2 表示从第2行开始读（跳过表头）
-        # values_only=True 直接获取单元格的值
-        rows = list(sheet.iter_rows(min_row=2, values_only=True))
+        recorder = XhrRecorder(page) if config.mode == "api" else None
+        timer = StepTimer()
         total_rows = len(rows)
 
-        for i, row in enumerate(rows):
-            # 获取当前行的题目和解析
-            # 注意：row 是一个元组，索引对应之前的 headers 索引
-            question_text = (
-                str(row[q_index]).strip() if row[q_index] is not None else ""
-            )
-            analysis_text = (
-                str(row[a_index]).strip() if row[a_index] is not None else ""
-            )
-
-            # 跳过无效数据
-            if not question_text or question_text == "None":
-                continue
-            if analysis_text == "None":
-                analysis_text = ""
-
-            print(f"[{i+1}/{total_rows}] 正在操作: {question_text[:10]}...")
+        for index, (row_number, question_text, analysis_text) in enumerate(rows):
+            print(f"[{row_number}/{total_rows}] 正在操作: {question_text[:10]}...")
 
             try:
-                # ==========================================
-                # --- A. 搜索 (终极稳定版) ---
-                # ==========================================
-
-                # 1. 定位：找到包含“题目名称”文字的那个区域，再找里面的input
-                print("刷新页面...")
-                await page.reload()
-                await page.wait_for_timeout(3000)
-                # 刷新后重新获取元素
-                search_item = page.locator(".el-form-item").filter(has_text="题目名称")
-                search_input = search_item.locator("input")
-
-                # 输入新题目
-                await search_input.fill(question_text)
-                await search_input.press("Enter")
-
-                # 4. 等待加载
-                # 搜索后，页面通常会有短暂的加载动画，建议等待一下
-                # 如果能找到加载遮罩最好： await page.locator('.el-loading-mask').wait_for(state='hidden')
-                await page.wait_for_timeout(1500)
-
-                # --- B. 点击修改 ---
-                target_row = page.locator("tr").filter(has_text=question_text)
-                edit_btn = target_row.locator('button:has-text("修改")')
-
-                if await edit_btn.count() > 0:
-                    await edit_btn.first.scroll_into_view_if_needed()
-                    await edit_btn.first.click()
-                else:
-                    print(f"   -> [跳过] 没找到对应题目: {question_text[:10]}")
-                    continue
-
-                # --- C. 填写解析 ---
-                analysis_box = page.locator('textarea[placeholder="请输入解析"]')
-                await analysis_box.wait_for(state="visible", timeout=5000)
-
-                await analysis_box.clear()
-                await analysis_box.fill(analysis_text)
-
-                # --- D. 保存 ---
-                # --- D. 保存 (最终修复版) ---
-                print("   -> 正在尝试保存...")
-
-                # 1. 锁定弹窗底部区域 (el-dialog__footer)
-                # 这一步是为了确保我们点的是弹窗里的按钮，而不是页面背后的
-                dialog_footer = page.locator(".el-dialog__footer").filter(
-                    has=page.locator(":visible")
-                )
-
-                # 2. 定位按钮
-                # 方案 A: 优先找蓝色的主按钮 (el-button--primary) 且包含 "确" 字的
-                # 注意：这里匹配 "确" 字即可，不管后面有没有空格
-                save_btn = dialog_footer.locator("button.el-button--primary").filter(
-                    has_text="确"
+                updated = await update_via_ui(
+                    page, question_text, analysis_text, timer, recorder
                 )
-
-                # 方案 B: 如果 A 没找到，尝试找文本完全匹配 "确 定" (带空格) 的按钮
-                if await save_btn.count() == 0:
-                    save_btn = dialog_footer.locator('button:has-text("确 定")')
-
-                # 方案 C: 还是没找到？试试不带空格的 "确定" (防止有些题目不一样)
-                if await save_btn.count() == 0:
-                    save_btn = dialog_footer.locator('button:has-text("确定")')
-
-                # 3. 执行点击
-                if await save_btn.count() > 0:
-                    # force=True 强行点击，忽略动画遮挡
-                    await save_btn.first.click(force=True)
-                else:
-                    print("   -> [警告] 实在找不到保存按钮，尝试盲按回车...")
-                    await page.keyboard.press("Enter")
-
-                # --- E. 等待完成 ---
-                await analysis_box.wait_for(state="hidden", timeout=5000)
-                print("   -> [成功]")
-
             except Exception as e:
                 print(f"   -> [错误] {e}")
                 await page.reload()
-                await page.wait_for_timeout(2000)
+                await wait_for_loading_async(page)
+                continue
+
+            # 解析为空的题目无法在保存请求里定位解析字段，换下一题录制
+            if recorder is None or not updated or not analysis_text:
+                continue
+
+            # 接口模式：第一道成功的题目录制完成后，其余题目直接重放接口
+            try:
+                capture = await build_capture(
+                    recorder, context, question_text, analysis_text
+                )
+            except Exception as e:
+                print(f"⚠️ 接口录制失败，继续在页面上逐题操作: {e}")
+                recorder = None
+                continue
+            save_capture(capture, config.capture_file)
+            await replay_all(capture, rows[index + 1 :], config.concurrency)
+            break
+
+        timer.report()
 
     print("\n全部搞定！")
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    asyncio.run(run(parser.parse_args()))